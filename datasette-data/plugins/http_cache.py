@@ -0,0 +1,223 @@
+# HTTP caching of the Datasette responses, keyed on the database's version
+#
+# The version is the end of the latest run in run_stats, written by the crawler when
+# it's done. GET responses get a strong ETag and a Cache-Control max-age, requests
+# revalidating an unchanged version get a 304 and rendered responses are kept in an
+# in-process LRU that is cleared when the version changes.
+# Requests with cookies and responses setting a cookie are passed through untouched.
+#
+# Configured in metadata.json under "plugins" > "http-cache":
+#   database         database the version is read from (default: "database")
+#   max_age          Cache-Control max-age in seconds (default: 3600)
+#   max_bytes        size of the LRU (default: 32 MiB)
+#   max_entry_bytes  larger responses aren't kept in the LRU (default: 1 MiB)
+#   post_paths       paths of POST requests cached on their body, e.g. ["/graphql"]
+
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+
+from datasette import hookimpl
+from datasette.version import __version__ as datasette_version
+
+DEFAULTS = {
+    "database": "database",
+    "max_age": 3600,
+    "max_bytes": 32 * 1024**2,
+    "max_entry_bytes": 1024**2,
+    "post_paths": [],
+}
+
+VERSION_SQL = "SELECT max(ended) FROM run_stats"
+
+# seconds the version is used before it's read again
+VERSION_TTL = 60
+
+# headers replaced by the cache's on the responses it handles
+REPLACED_HEADERS = (b"cache-control", b"etag")
+
+
+class LRU:
+    """Responses by ETag, the least recently used are evicted past max_bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[str, tuple[int, list, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[int, list, bytes] | None:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, status: int, headers: list, body: bytes):
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[2])
+        self.entries[key] = (status, headers, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+async def read_body(receive) -> tuple[bytes, object]:
+    """Read the request body, returns it with a receive that replays it"""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = b"".join(chunks)
+
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return body, replay
+
+
+class HttpCache:
+    def __init__(self, app, datasette):
+        self.app = app
+        self.datasette = datasette
+        self.config = DEFAULTS | (datasette.plugin_config("http-cache") or {})
+        self.lru = LRU(self.config["max_bytes"])
+        self.version: str | None = None
+        self.version_read = float("-inf")
+
+    async def get_version(self) -> str | None:
+        if time.monotonic() - self.version_read > VERSION_TTL:
+            try:
+                db = self.datasette.get_database(self.config["database"])
+                version = (await db.execute(VERSION_SQL)).single_value()
+            except (KeyError, sqlite3.Error):
+                version = None
+            if version != self.version:
+                self.lru.clear()
+            self.version = version
+            self.version_read = time.monotonic()
+        return self.version
+
+    def cacheable(self, scope) -> bool:
+        # signed in actors, csrf tokens, ... cookies may change the response
+        if any(name == b"cookie" for name, _ in scope["headers"]):
+            return False
+        return scope["method"] == "GET" or (
+            scope["method"] == "POST" and scope["path"] in self.config["post_paths"]
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.cacheable(scope):
+            return await self.app(scope, receive, send)
+        version = await self.get_version()
+        if version is None:
+            return await self.app(scope, receive, send)
+
+        body = b""
+        if scope["method"] == "POST":
+            body, receive = await read_body(receive)
+
+        # absolute urls in the responses are built from the host
+        host = dict(scope["headers"]).get(b"host", b"")
+        key = hashlib.sha256()
+        for part in (
+            version,
+            datasette_version,
+            host,
+            scope["method"],
+            scope["path"],
+            scope["query_string"],
+            body,
+        ):
+            key.update(part if isinstance(part, bytes) else part.encode())
+            key.update(b"\0")
+        etag = f'"{key.hexdigest()[:32]}"'
+
+        cache_headers = []
+        if scope["method"] == "GET":
+            cache_headers = [
+                (b"etag", etag.encode()),
+                (
+                    b"cache-control",
+                    f"public, max-age={self.config['max_age']}".encode(),
+                ),
+            ]
+            if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode()
+            if etag in (
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+            ):
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": cache_headers,
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        cached = self.lru.get(etag)
+        if cached is not None:
+            status, headers, content = cached
+            await send(
+                {"type": "http.response.start", "status": status, "headers": headers}
+            )
+            await send({"type": "http.response.body", "body": content})
+            return
+
+        start: dict = {}
+        chunks: list[bytes] = []
+        size = 0
+        keep = True
+
+        async def capture(message):
+            nonlocal start, size, keep
+            if message["type"] == "http.response.start":
+                # cookies, e.g. the csrf token of pages with forms, are per client
+                keep = message["status"] == 200 and not any(
+                    name.lower() == b"set-cookie"
+                    for name, _ in message.get("headers", [])
+                )
+                if keep:
+                    message = message | {
+                        "headers": [
+                            (name, value)
+                            for name, value in message.get("headers", [])
+                            if name.lower() not in REPLACED_HEADERS
+                        ]
+                        + cache_headers
+                    }
+                start = message
+            elif message["type"] == "http.response.body" and keep:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if size > self.config["max_entry_bytes"]:
+                    keep = False
+                    chunks.clear()
+                elif not message.get("more_body", False):
+                    self.lru.put(
+                        etag, start["status"], start["headers"], b"".join(chunks)
+                    )
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+
+@hookimpl
+def asgi_wrapper(datasette):
+    def wrap_with_http_cache(app):
+        return HttpCache(app, datasette)
+
+    return wrap_with_http_cache
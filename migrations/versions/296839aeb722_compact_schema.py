@@ -0,0 +1,321 @@
+"""compact_schema
+
+Revision ID: 296839aeb722
+Revises: 3ccc17dfaf8f
+Create Date: 2026-10-19 12:02:31.527161
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = "296839aeb722"
+down_revision = "3ccc17dfaf8f"
+branch_labels = None
+depends_on = None
+
+
+def year_count_sql(row, change):
+    year = f"CAST(substr({row}.release_date, 1, 4) AS INTEGER)"
+    match = (
+        f"year IS {year} AND type IS {row}.type "
+        f"AND controller_support IS {row}.controller_support"
+    )
+    return f"""
+        INSERT INTO app_year_count (year, type, controller_support, apps)
+        SELECT {year}, {row}.type, {row}.controller_support, 0
+        WHERE NOT EXISTS (SELECT 1 FROM app_year_count WHERE {match});
+        UPDATE app_year_count SET apps = apps {change} WHERE {match};
+        DELETE FROM app_year_count WHERE apps <= 0;"""
+
+
+def link_count_sql(table, link_table):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_insert
+        AFTER INSERT ON {link_table}
+        BEGIN
+            INSERT INTO {table}_app_count ({table}_pk, apps) VALUES (NEW.{table}_pk, 1)
+            ON CONFLICT ({table}_pk) DO UPDATE SET apps = apps + 1;
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_delete
+        AFTER DELETE ON {link_table}
+        BEGIN
+            UPDATE {table}_app_count SET apps = apps - 1 WHERE {table}_pk = OLD.{table}_pk;
+        END""",
+    ]
+
+
+def fts_sql(rowid):
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS steam_app_fts USING fts5(
+            name, content='steam_app', content_rowid='{rowid}',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS steam_app_fts_insert AFTER INSERT ON steam_app
+        BEGIN
+            INSERT INTO steam_app_fts (rowid, name) VALUES (NEW.{rowid}, NEW.name);
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS steam_app_fts_delete AFTER DELETE ON steam_app
+        BEGIN
+            INSERT INTO steam_app_fts (steam_app_fts, rowid, name)
+            VALUES ('delete', OLD.{rowid}, OLD.name);
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS steam_app_fts_update AFTER UPDATE OF name ON steam_app
+        BEGIN
+            INSERT INTO steam_app_fts (steam_app_fts, rowid, name)
+            VALUES ('delete', OLD.{rowid}, OLD.name);
+            INSERT INTO steam_app_fts (rowid, name) VALUES (NEW.{rowid}, NEW.name);
+        END""",
+        "INSERT INTO steam_app_fts (steam_app_fts) VALUES ('rebuild')",
+    ]
+
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_insert
+    AFTER INSERT ON steam_app
+    BEGIN{year_count_sql("NEW", "+ 1")}
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_update
+    AFTER UPDATE OF release_date, type, controller_support ON steam_app
+    BEGIN{year_count_sql("OLD", "- 1")}{year_count_sql("NEW", "+ 1")}
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_delete
+    AFTER DELETE ON steam_app
+    BEGIN{year_count_sql("OLD", "- 1")}
+    END""",
+    *link_count_sql("genre", "genresteammapplink"),
+    *link_count_sql("category", "categorysteamapplink"),
+]
+
+TRIGGER_NAMES = [
+    "steam_app_year_count_insert",
+    "steam_app_year_count_update",
+    "steam_app_year_count_delete",
+    "genre_app_count_insert",
+    "genre_app_count_delete",
+    "category_app_count_insert",
+    "category_app_count_delete",
+    "steam_app_fts_insert",
+    "steam_app_fts_delete",
+    "steam_app_fts_update",
+]
+
+APP_COLUMNS = (
+    "appid, type, is_free, name, controller_support, metacritic_score, "
+    "metacritic_url, recommendations, achievements_total, release_date, "
+    "initial_price, current_price"
+)
+
+
+def epoch_microseconds(column):
+    # text datetimes are stored as "YYYY-MM-DD HH:MM:SS.ffffff"
+    return (
+        f"CAST(strftime('%s', {column}) AS INTEGER) * 1000000"
+        f" + CAST(substr({column}, 21, 6) AS INTEGER)"
+    )
+
+
+def text_datetime(column):
+    return (
+        f"strftime('%Y-%m-%d %H:%M:%S', {column} / 1000000, 'unixepoch')"
+        f" || printf('.%06d', {column} % 1000000)"
+    )
+
+
+def drop_triggers():
+    for name in TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS steam_app_fts")
+
+
+def replace_tables(tables):
+    for table in tables:
+        op.drop_table(table)
+        op.rename_table(f"{table}_new", table)
+
+
+def upgrade():
+    drop_triggers()
+
+    op.create_table(
+        "steam_app_new",
+        sa.Column("appid", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("type", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("is_free", sa.Boolean(), nullable=True),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "controller_support", sqlmodel.sql.sqltypes.AutoString(), nullable=True
+        ),
+        sa.Column("metacritic_score", sa.Integer(), nullable=True),
+        sa.Column("metacritic_url", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("recommendations", sa.Integer(), nullable=True),
+        sa.Column("achievements_total", sa.Integer(), nullable=False),
+        sa.Column("release_date", sa.Date(), nullable=True),
+        sa.Column("initial_price", sa.Integer(), nullable=True),
+        sa.Column("current_price", sa.Integer(), nullable=True),
+        sa.Column("created", sa.Integer(), nullable=False),
+        sa.Column("updated", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("appid"),
+    )
+    op.create_table(
+        "genresteammapplink_new",
+        sa.Column("appid", sa.Integer(), nullable=False),
+        sa.Column("genre_pk", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["appid"], ["steam_app.appid"]),
+        sa.ForeignKeyConstraint(["genre_pk"], ["genre.pk"]),
+        sa.PrimaryKeyConstraint("appid", "genre_pk"),
+        sqlite_with_rowid=False,
+    )
+    op.create_table(
+        "categorysteamapplink_new",
+        sa.Column("appid", sa.Integer(), nullable=False),
+        sa.Column("category_pk", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["appid"], ["steam_app.appid"]),
+        sa.ForeignKeyConstraint(["category_pk"], ["category.pk"]),
+        sa.PrimaryKeyConstraint("appid", "category_pk"),
+        sqlite_with_rowid=False,
+    )
+    op.create_table(
+        "achievement_new",
+        sa.Column("pk", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("percent", sa.Float(), nullable=False),
+        sa.Column("appid", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["appid"], ["steam_app.appid"]),
+        sa.PrimaryKeyConstraint("pk"),
+    )
+
+    op.execute(
+        f"""
+        INSERT INTO steam_app_new ({APP_COLUMNS}, created, updated)
+        SELECT {APP_COLUMNS}, {epoch_microseconds("created")},
+            {epoch_microseconds("updated")}
+        FROM steam_app ORDER BY appid
+        """
+    )
+    for table, link_table in (
+        ("genre", "genresteammapplink"),
+        ("category", "categorysteamapplink"),
+    ):
+        op.execute(
+            f"""
+            INSERT INTO {link_table}_new (appid, {table}_pk)
+            SELECT steam_app.appid, link.{table}_pk FROM {link_table} AS link
+            JOIN steam_app ON steam_app.pk = link.steam_app_pk
+            ORDER BY 1, 2
+            """
+        )
+    op.execute(
+        """
+        INSERT INTO achievement_new (pk, name, percent, appid)
+        SELECT achievement.pk, achievement.name, achievement.percent, steam_app.appid
+        FROM achievement JOIN steam_app ON steam_app.pk = achievement.steam_app_pk
+        """
+    )
+
+    replace_tables(
+        ["achievement", "genresteammapplink", "categorysteamapplink", "steam_app"]
+    )
+    op.create_index("ix_steam_app_name", "steam_app", ["name"], unique=False)
+    op.create_index("ix_achievement_appid", "achievement", ["appid"], unique=False)
+
+    for trigger in TRIGGERS + fts_sql("appid"):
+        op.execute(trigger)
+
+
+def downgrade():
+    drop_triggers()
+
+    op.create_table(
+        "steam_app_new",
+        sa.Column("pk", sa.Integer(), nullable=False),
+        sa.Column("appid", sa.Integer(), nullable=False),
+        sa.Column("type", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("is_free", sa.Boolean(), nullable=True),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column(
+            "controller_support", sqlmodel.sql.sqltypes.AutoString(), nullable=True
+        ),
+        sa.Column("metacritic_score", sa.Integer(), nullable=True),
+        sa.Column("metacritic_url", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("recommendations", sa.Integer(), nullable=True),
+        sa.Column("achievements_total", sa.Integer(), nullable=False),
+        sa.Column("release_date", sa.Date(), nullable=True),
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.Column("initial_price", sa.Integer(), nullable=True),
+        sa.Column("current_price", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("pk"),
+    )
+    op.create_table(
+        "genresteammapplink_new",
+        sa.Column("genre_pk", sa.Integer(), nullable=False),
+        sa.Column("steam_app_pk", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["genre_pk"], ["genre.pk"]),
+        sa.ForeignKeyConstraint(["steam_app_pk"], ["steam_app.pk"]),
+        sa.PrimaryKeyConstraint("genre_pk", "steam_app_pk"),
+    )
+    op.create_table(
+        "categorysteamapplink_new",
+        sa.Column("category_pk", sa.Integer(), nullable=False),
+        sa.Column("steam_app_pk", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["category_pk"], ["category.pk"]),
+        sa.ForeignKeyConstraint(["steam_app_pk"], ["steam_app.pk"]),
+        sa.PrimaryKeyConstraint("category_pk", "steam_app_pk"),
+    )
+    op.create_table(
+        "achievement_new",
+        sa.Column("pk", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("percent", sa.Float(), nullable=False),
+        sa.Column("steam_app_pk", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["steam_app_pk"], ["steam_app.pk"]),
+        sa.PrimaryKeyConstraint("pk"),
+    )
+
+    # the appid doubles as the surrogate key
+    op.execute(
+        f"""
+        INSERT INTO steam_app_new (pk, {APP_COLUMNS}, created, updated)
+        SELECT appid, {APP_COLUMNS}, {text_datetime("created")},
+            {text_datetime("updated")}
+        FROM steam_app
+        """
+    )
+    for table, link_table in (
+        ("genre", "genresteammapplink"),
+        ("category", "categorysteamapplink"),
+    ):
+        op.execute(
+            f"""
+            INSERT INTO {link_table}_new ({table}_pk, steam_app_pk)
+            SELECT {table}_pk, appid FROM {link_table}
+            """
+        )
+    op.execute(
+        """
+        INSERT INTO achievement_new (pk, name, percent, steam_app_pk)
+        SELECT pk, name, percent, appid FROM achievement
+        """
+    )
+
+    replace_tables(
+        ["achievement", "genresteammapplink", "categorysteamapplink", "steam_app"]
+    )
+    op.create_index("ix_steam_app_appid", "steam_app", ["appid"], unique=True)
+    op.create_index("ix_steam_app_name", "steam_app", ["name"], unique=False)
+
+    for trigger in TRIGGERS + fts_sql("pk"):
+        op.execute(trigger)
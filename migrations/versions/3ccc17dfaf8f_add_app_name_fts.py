@@ -0,0 +1,56 @@
+"""add_app_name_fts
+
+Revision ID: 3ccc17dfaf8f
+Revises: e435511a7b57
+Create Date: 2026-10-19 11:49:07.883790
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "3ccc17dfaf8f"
+down_revision = "e435511a7b57"
+branch_labels = None
+depends_on = None
+
+
+FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS steam_app_fts USING fts5(
+        name, content='steam_app', content_rowid='pk',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """
+    CREATE TRIGGER IF NOT EXISTS steam_app_fts_insert AFTER INSERT ON steam_app
+    BEGIN
+        INSERT INTO steam_app_fts (rowid, name) VALUES (NEW.pk, NEW.name);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS steam_app_fts_delete AFTER DELETE ON steam_app
+    BEGIN
+        INSERT INTO steam_app_fts (steam_app_fts, rowid, name)
+        VALUES ('delete', OLD.pk, OLD.name);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS steam_app_fts_update AFTER UPDATE OF name ON steam_app
+    BEGIN
+        INSERT INTO steam_app_fts (steam_app_fts, rowid, name)
+        VALUES ('delete', OLD.pk, OLD.name);
+        INSERT INTO steam_app_fts (rowid, name) VALUES (NEW.pk, NEW.name);
+    END""",
+]
+
+
+def upgrade():
+    for sql in FTS_SQL:
+        op.execute(sql)
+    # index the apps that are already stored
+    op.execute("INSERT INTO steam_app_fts (steam_app_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS steam_app_fts_{trigger}")
+    op.execute("DROP TABLE IF EXISTS steam_app_fts")
@@ -0,0 +1,142 @@
+"""add_app_counts
+
+Revision ID: e435511a7b57
+Revises: c493b9781938
+Create Date: 2026-10-19 11:46:57.405448
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = "e435511a7b57"
+down_revision = "c493b9781938"
+branch_labels = None
+depends_on = None
+
+
+def year_count_sql(row, change):
+    year = f"CAST(substr({row}.release_date, 1, 4) AS INTEGER)"
+    match = (
+        f"year IS {year} AND type IS {row}.type "
+        f"AND controller_support IS {row}.controller_support"
+    )
+    return f"""
+        INSERT INTO app_year_count (year, type, controller_support, apps)
+        SELECT {year}, {row}.type, {row}.controller_support, 0
+        WHERE NOT EXISTS (SELECT 1 FROM app_year_count WHERE {match});
+        UPDATE app_year_count SET apps = apps {change} WHERE {match};
+        DELETE FROM app_year_count WHERE apps <= 0;"""
+
+
+def link_count_sql(table, link_table):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_insert
+        AFTER INSERT ON {link_table}
+        BEGIN
+            INSERT INTO {table}_app_count ({table}_pk, apps) VALUES (NEW.{table}_pk, 1)
+            ON CONFLICT ({table}_pk) DO UPDATE SET apps = apps + 1;
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_delete
+        AFTER DELETE ON {link_table}
+        BEGIN
+            UPDATE {table}_app_count SET apps = apps - 1 WHERE {table}_pk = OLD.{table}_pk;
+        END""",
+    ]
+
+
+COUNT_TRIGGERS = {
+    "steam_app_year_count_insert": f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_insert
+    AFTER INSERT ON steam_app
+    BEGIN{year_count_sql("NEW", "+ 1")}
+    END""",
+    "steam_app_year_count_update": f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_update
+    AFTER UPDATE OF release_date, type, controller_support ON steam_app
+    BEGIN{year_count_sql("OLD", "- 1")}{year_count_sql("NEW", "+ 1")}
+    END""",
+    "steam_app_year_count_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_delete
+    AFTER DELETE ON steam_app
+    BEGIN{year_count_sql("OLD", "- 1")}
+    END""",
+    "genre_app_count_insert": link_count_sql("genre", "genresteammapplink")[0],
+    "genre_app_count_delete": link_count_sql("genre", "genresteammapplink")[1],
+    "category_app_count_insert": link_count_sql("category", "categorysteamapplink")[0],
+    "category_app_count_delete": link_count_sql("category", "categorysteamapplink")[1],
+}
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table(
+        "app_year_count",
+        sa.Column("pk", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=True),
+        sa.Column("type", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column(
+            "controller_support", sqlmodel.sql.sqltypes.AutoString(), nullable=True
+        ),
+        sa.Column("apps", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("pk"),
+    )
+    op.create_table(
+        "category_app_count",
+        sa.Column("category_pk", sa.Integer(), nullable=False),
+        sa.Column("apps", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["category_pk"],
+            ["category.pk"],
+        ),
+        sa.PrimaryKeyConstraint("category_pk"),
+    )
+    op.create_table(
+        "genre_app_count",
+        sa.Column("genre_pk", sa.Integer(), nullable=False),
+        sa.Column("apps", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["genre_pk"],
+            ["genre.pk"],
+        ),
+        sa.PrimaryKeyConstraint("genre_pk"),
+    )
+    # ### end Alembic commands ###
+
+    op.execute(
+        """
+        INSERT INTO app_year_count (year, type, controller_support, apps)
+        SELECT CAST(substr(release_date, 1, 4) AS INTEGER), type, controller_support, count(*)
+        FROM steam_app GROUP BY 1, 2, 3
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO genre_app_count (genre_pk, apps)
+        SELECT genre_pk, count(*) FROM genresteammapplink GROUP BY genre_pk
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO category_app_count (category_pk, apps)
+        SELECT category_pk, count(*) FROM categorysteamapplink GROUP BY category_pk
+        """
+    )
+    for trigger in COUNT_TRIGGERS.values():
+        op.execute(trigger)
+
+
+def downgrade():
+    for name in COUNT_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table("genre_app_count")
+    op.drop_table("category_app_count")
+    op.drop_table("app_year_count")
+    # ### end Alembic commands ###
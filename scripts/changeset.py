@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+# Export the rows changed since an `updated` watermark as a compressed changeset
+# and apply changesets to a local copy of the database
+#
+# A changeset is a gzipped sqlite database with the same tables as the source,
+# holding the changed apps with all of their links and achievements, the genres and
+# categories they link to, the errors and aliases recorded since the watermark and
+# the tombstones of the apps, errors and aliases deleted since.
+# Applying it merges it into the target so links and achievements that were removed
+# from an app are removed from the target as well, and so are the deleted rows.
+
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+
+from merge import merge_databases
+
+TABLES = [
+    "steam_app",
+    "genre",
+    "category",
+    "genresteammapplink",
+    "categorysteamapplink",
+    "achievement",
+    "achievement_stats",
+    "app_summary",
+    "appid_error",
+    "appid_alias",
+    "tombstone",
+    "run_stats",
+]
+
+
+def create_tables(conn: sqlite3.Connection):
+    """Create TABLES in the attached changeset with the source's schema"""
+    for (sql,) in conn.execute(
+        f"""
+        SELECT sql FROM main.sqlite_master WHERE type = 'table'
+        AND name IN ({", ".join("?" for _ in TABLES)})
+        """,
+        TABLES,
+    ).fetchall():
+        conn.execute(sql.replace("CREATE TABLE ", "CREATE TABLE changeset.", 1))
+    conn.execute("CREATE TABLE changeset.changeset_info (since INTEGER, until INTEGER)")
+
+
+def export_changeset(
+    database: str | Path, output: str | Path, since: int | None = None
+) -> tuple[int, int | None]:
+    """Write the rows changed after `since` (everything if None) to a gzipped changeset
+
+    Returns the number of apps and the new watermark, the latest change exported
+    """
+    since = since or 0
+    with tempfile.TemporaryDirectory() as tmpdir:
+        changeset_path = Path(tmpdir) / "changeset.db"
+        conn = sqlite3.connect(database, isolation_level=None)
+        try:
+            conn.execute("ATTACH DATABASE ? AS changeset", (str(changeset_path),))
+            # read everything from a single snapshot of the source
+            conn.execute("BEGIN")
+            create_tables(conn)
+            conn.execute(
+                "INSERT INTO changeset.steam_app SELECT * FROM steam_app WHERE updated > ?",
+                (since,),
+            )
+            changed = "SELECT appid FROM changeset.steam_app"
+            for table in (
+                "genresteammapplink",
+                "categorysteamapplink",
+                "achievement",
+                "achievement_stats",
+                "app_summary",
+            ):
+                conn.execute(
+                    f"""
+                    INSERT INTO changeset.{table}
+                    SELECT * FROM {table} WHERE appid IN ({changed})
+                    """
+                )
+            # the genres and categories of the changed links, merged on their id
+            for table, link_table in (
+                ("genre", "genresteammapplink"),
+                ("category", "categorysteamapplink"),
+            ):
+                conn.execute(
+                    f"""
+                    INSERT INTO changeset.{table} SELECT * FROM {table}
+                    WHERE pk IN (SELECT {table}_pk FROM changeset.{link_table})
+                    """
+                )
+            for table in ("appid_error", "appid_alias"):
+                conn.execute(
+                    f"INSERT INTO changeset.{table} SELECT * FROM {table} WHERE updated > ?",
+                    (since,),
+                )
+            conn.execute(
+                "INSERT INTO changeset.tombstone SELECT * FROM tombstone WHERE deleted > ?",
+                (since,),
+            )
+            # run_stats.started is a text datetime and `updated` is in microseconds
+            conn.execute(
+                """
+                INSERT INTO changeset.run_stats SELECT * FROM run_stats
+                WHERE started > strftime('%Y-%m-%d %H:%M:%S', ? / 1000000, 'unixepoch')
+                """,
+                (since,),
+            )
+            (apps,) = conn.execute(
+                "SELECT count(*) FROM changeset.steam_app"
+            ).fetchone()
+            (until,) = conn.execute(
+                """
+                SELECT max(changed) FROM (
+                    SELECT max(updated) AS changed FROM changeset.steam_app
+                    UNION ALL SELECT max(updated) FROM changeset.appid_error
+                    UNION ALL SELECT max(updated) FROM changeset.appid_alias
+                    UNION ALL SELECT max(deleted) FROM changeset.tombstone
+                )
+                """
+            ).fetchone()
+            # without changes the watermark stays where it was
+            until = until or since or None
+            conn.execute(
+                "INSERT INTO changeset.changeset_info VALUES (?, ?)",
+                (since or None, until),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with open(changeset_path, "rb") as src, gzip.open(output, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+    return apps, until
+
+
+def apply_changeset(database: str | Path, changeset: str | Path) -> int | None:
+    """Merge a changeset into database in one transaction, returns the new watermark"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        changeset_path = Path(tmpdir) / "changeset.db"
+        with gzip.open(changeset, "rb") as src, open(changeset_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+        conn = sqlite3.connect(changeset_path)
+        try:
+            (until,) = conn.execute("SELECT until FROM changeset_info").fetchone()
+        finally:
+            conn.close()
+
+        merge_databases(database, [changeset_path])
+
+    return until
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export a changeset")
+    export_parser.add_argument("database", help="Database to export from")
+    export_parser.add_argument("output", help="Changeset file (e.g. changeset.db.gz)")
+    export_parser.add_argument(
+        "--since",
+        type=int,
+        default=None,
+        help="export the rows changed after this watermark (default: everything)",
+    )
+
+    apply_parser = subparsers.add_parser("apply", help="apply changesets")
+    apply_parser.add_argument("database", help="Database to apply the changesets to")
+    apply_parser.add_argument("changesets", nargs="+", help="Changeset files")
+
+    args = parser.parse_args(argv)
+
+    if not Path(args.database).exists():
+        print("database doesn't exist")
+        return 2
+
+    start = time.monotonic()
+    if args.command == "export":
+        apps, until = export_changeset(args.database, args.output, args.since)
+        print(
+            f"exported {apps} apps to {args.output} in {time.monotonic() - start:.1f}s"
+        )
+        print(f"watermark: {until}")
+    else:
+        for changeset in args.changesets:
+            until = apply_changeset(args.database, changeset)
+            print(f"applied {changeset}, watermark: {until}")
+        print(f"applied in {time.monotonic() - start:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+# Export the tables of a steam2sqlite database to columnar files for analysis
+# Tables are streamed in chunks of CHUNK_ROWS, to Parquet with pyarrow (strings
+# dictionary encoded, dates and times typed), or without it to CSVs in a single
+# compressed zip archive. The apps export is steam_app denormalized with lists of its
+# genres and categories.
+
+import csv
+import io
+import json
+import sqlite3
+import time
+import zipfile
+from argparse import ArgumentParser
+from collections.abc import Iterator, Sequence
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+TABLES = [
+    "steam_app",
+    "achievement",
+    "achievement_stats",
+    "genre",
+    "category",
+    "genresteammapplink",
+    "categorysteamapplink",
+]
+
+# rows read, converted and written at a time
+CHUNK_ROWS = 16_384
+
+# archive of the CSV exports, one <name>.csv per export
+CSV_ARCHIVE = "tables.csv.zip"
+
+# EpochMicroseconds columns of models.py, declared as INTEGER
+TIMESTAMP_COLUMNS = {"created", "updated", "refresh_due", "achievements_due"}
+EPOCH = datetime(1970, 1, 1)
+
+LINKS_SQL = """
+    SELECT json_group_array(description) FROM (
+        SELECT {link}.description FROM {link_table}
+        JOIN {link} ON {link}.pk = {link_table}.{link}_pk
+        WHERE {link_table}.appid = steam_app.appid
+        ORDER BY {link}.id
+    )
+"""
+
+APPS_SQL = f"""
+    SELECT steam_app.*,
+        ({LINKS_SQL.format(link="genre", link_table="genresteammapplink")}) AS genres,
+        ({LINKS_SQL.format(link="category", link_table="categorysteamapplink")})
+            AS categories
+    FROM steam_app ORDER BY appid
+"""
+
+
+def column_kind(name: str, declared_type: str) -> str:
+    """int, float, bool, date, timestamp or string"""
+    declared_type = declared_type.upper()
+    if name in TIMESTAMP_COLUMNS and "INT" in declared_type:
+        return "timestamp"
+    if "INT" in declared_type:
+        return "int"
+    if any(real in declared_type for real in ("REAL", "FLOA", "DOUB")):
+        return "float"
+    if "BOOL" in declared_type:
+        return "bool"
+    if declared_type == "DATE":
+        return "date"
+    return "string"
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> list[tuple[str, str]]:
+    """(name, kind) of the columns of table"""
+    return [
+        (row[1], column_kind(row[1], row[2]))
+        for row in conn.execute(f"PRAGMA table_info({table})")
+    ]
+
+
+def exports(conn: sqlite3.Connection) -> Iterator[tuple[str, str, list]]:
+    """(name, query, columns) of the tables in the database and of the apps"""
+    tables = {
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    for table in TABLES:
+        if table in tables:
+            yield table, f"SELECT * FROM {table}", table_columns(conn, table)
+    if {"steam_app", "genre", "category"} <= tables:
+        columns = table_columns(conn, "steam_app")
+        yield "apps", APPS_SQL, columns + [("genres", "list"), ("categories", "list")]
+
+
+def read_chunks(conn: sqlite3.Connection, query: str) -> Iterator[list[tuple]]:
+    cursor = conn.execute(query)
+    while rows := cursor.fetchmany(CHUNK_ROWS):
+        yield rows
+
+
+def to_timestamp(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def arrow_type(kind: str):
+    return {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us"),
+        "string": pa.dictionary(pa.int32(), pa.string()),
+        "list": pa.list_(pa.string()),
+    }[kind]
+
+
+def arrow_column(values: list, kind: str):
+    if kind == "bool":
+        values = [None if value is None else bool(value) for value in values]
+    elif kind == "date":
+        values = [date.fromisoformat(value) if value else None for value in values]
+    elif kind == "list":
+        values = [json.loads(value) if value else None for value in values]
+    elif kind == "string":
+        return pa.array(values, pa.string()).dictionary_encode()
+    return pa.array(values, arrow_type(kind))
+
+
+def write_parquet(
+    conn: sqlite3.Connection, query: str, columns: list, path: Path
+) -> int:
+    schema = pa.schema([(name, arrow_type(kind)) for name, kind in columns])
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in read_chunks(conn, query):
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        arrow_column([row[i] for row in chunk], kind)
+                        for i, (_, kind) in enumerate(columns)
+                    ],
+                    schema=schema,
+                )
+            )
+            rows += len(chunk)
+    return rows
+
+
+def write_csv(
+    conn: sqlite3.Connection,
+    query: str,
+    columns: list,
+    archive: zipfile.ZipFile,
+    member: str,
+) -> int:
+    """Stream the rows of query to the member file of archive"""
+    timestamps = [i for i, (_, kind) in enumerate(columns) if kind == "timestamp"]
+    rows = 0
+    with (
+        archive.open(member, "w", force_zip64=True) as entry,
+        io.TextIOWrapper(entry, encoding="utf-8", newline="") as csv_file,
+    ):
+        writer = csv.writer(csv_file)
+        writer.writerow([name for name, _ in columns])
+        for chunk in read_chunks(conn, query):
+            if timestamps:
+                chunk = [list(row) for row in chunk]
+                for row in chunk:
+                    for i in timestamps:
+                        if row[i] is not None:
+                            row[i] = to_timestamp(row[i]).isoformat()
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def export(database: str | Path, directory: str | Path, fmt: str) -> dict[str, int]:
+    """Write every export to directory, returns the rows of each
+
+    Parquet files, or the CSV archive, are written next to their final name and
+    replace it when complete.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    counts = {}
+    try:
+        if fmt == "parquet":
+            for name, query, columns in exports(conn):
+                start = time.monotonic()
+                path = directory / f"{name}.parquet"
+                partial = path.with_name(f"{path.name}.partial")
+                counts[name] = write_parquet(conn, query, columns, partial)
+                partial.replace(path)
+                print(
+                    f"exported {counts[name]} rows to {path} "
+                    f"in {time.monotonic() - start:.1f}s"
+                )
+        else:
+            path = directory / CSV_ARCHIVE
+            partial = path.with_name(f"{path.name}.partial")
+            with zipfile.ZipFile(
+                partial, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6
+            ) as archive:
+                for name, query, columns in exports(conn):
+                    start = time.monotonic()
+                    counts[name] = write_csv(
+                        conn, query, columns, archive, f"{name}.csv"
+                    )
+                    print(
+                        f"exported {counts[name]} rows to {path}:{name}.csv "
+                        f"in {time.monotonic() - start:.1f}s"
+                    )
+            partial.replace(path)
+    finally:
+        conn.close()
+    return counts
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    parser.add_argument("database", help="Database to export")
+    parser.add_argument("directory", help="Directory the files are written to")
+    parser.add_argument(
+        "--format",
+        choices=["parquet", "csv"],
+        default="parquet" if pa else "csv",
+        help="parquet (needs pyarrow, the default when it's installed) or csv, "
+        f"written to a single {CSV_ARCHIVE}",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.database).exists():
+        print(f"{args.database} doesn't exist")
+        return 2
+    if args.format == "parquet" and pa is None:
+        print("parquet needs pyarrow: pip install pyarrow, or use --format csv")
+        return 2
+
+    export(args.database, args.directory, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
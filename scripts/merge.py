@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+# Merge steam2sqlite databases (e.g. shards or partial runs) into a target database
+# Rows are copied with set based SQL on ATTACHed databases, all in one transaction
+
+import sqlite3
+import time
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+
+# sqlite's default SQLITE_MAX_ATTACHED
+MAX_SOURCES = 10
+
+
+def columns(conn: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def apply_tombstones(conn: sqlite3.Connection, schema: str):
+    """Delete the apps, errors and aliases of main deleted in `schema` since"""
+    for table in ("steam_app", "appid_error", "appid_alias"):
+        conn.execute(
+            f"""
+            DELETE FROM main.{table} WHERE EXISTS (
+                SELECT 1 FROM {schema}.tombstone AS tomb
+                WHERE tomb.table_name = '{table}' AND tomb.appid = {table}.appid
+                AND tomb.deleted >= ifnull({table}.updated, 0)
+            )
+            """
+        )
+    # along with everything stored for the deleted apps
+    deleted = f"""
+        SELECT appid FROM {schema}.tombstone WHERE table_name = 'steam_app'
+        AND appid NOT IN (SELECT appid FROM main.steam_app)
+    """
+    for table in (
+        "genresteammapplink",
+        "categorysteamapplink",
+        "achievement",
+        "achievement_stats",
+        "app_summary",
+    ):
+        conn.execute(f"DELETE FROM main.{table} WHERE appid IN ({deleted})")
+
+
+def merge_source(conn: sqlite3.Connection, schema: str) -> int:
+    """Merge the attached database `schema` into main, returns the number of apps merged
+
+    The newest `updated` wins for apps in both databases. Genres and categories are
+    matched on their steam id and the links are remapped to their pk in main.
+    Tombstones delete the rows of main that aren't newer than the deletion.
+    """
+    if columns(conn, schema, "tombstone"):
+        apply_tombstones(conn, schema)
+
+    for table in ("genre", "category"):
+        conn.execute(
+            f"""
+            INSERT INTO main.{table} (id, description)
+            SELECT id, description FROM {schema}.{table}
+            WHERE id NOT IN (SELECT id FROM main.{table})
+            GROUP BY id
+            """
+        )
+
+    # apps that are new to main or newer than main's copy
+    conn.execute("DROP TABLE IF EXISTS temp.merged_app")
+    conn.execute("CREATE TEMP TABLE merged_app (appid INTEGER PRIMARY KEY)")
+    conn.execute(
+        f"""
+        INSERT INTO temp.merged_app (appid)
+        SELECT src.appid FROM {schema}.steam_app AS src
+        LEFT JOIN main.steam_app AS dst ON dst.appid = src.appid
+        WHERE dst.appid IS NULL OR src.updated > dst.updated
+        """
+    )
+
+    app_columns = [
+        col
+        for col in columns(conn, "main", "steam_app")
+        if col in columns(conn, schema, "steam_app")
+    ]
+    updates = ", ".join(
+        f"{col} = excluded.{col}"
+        for col in app_columns
+        if col not in ("appid", "created")
+    )
+    conn.execute(
+        f"""
+        INSERT INTO main.steam_app ({", ".join(app_columns)})
+        SELECT {", ".join(f"src.{col}" for col in app_columns)}
+        FROM {schema}.steam_app AS src JOIN temp.merged_app USING (appid)
+        WHERE true
+        ON CONFLICT (appid) DO UPDATE SET {updates},
+            created = min(steam_app.created, excluded.created)
+        """
+    )
+
+    for table, link_table in (
+        ("genre", "genresteammapplink"),
+        ("category", "categorysteamapplink"),
+    ):
+        conn.execute(
+            f"""
+            DELETE FROM main.{link_table}
+            WHERE appid IN (SELECT appid FROM temp.merged_app)
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO main.{link_table} (appid, {table}_pk)
+            SELECT link.appid, dst.pk
+            FROM {schema}.{link_table} AS link
+            JOIN temp.merged_app USING (appid)
+            JOIN {schema}.{table} AS src ON src.pk = link.{table}_pk
+            JOIN (
+                SELECT id, min(pk) AS pk FROM main.{table} GROUP BY id
+            ) AS dst ON dst.id = src.id
+            """
+        )
+
+    conn.execute(
+        "DELETE FROM main.achievement WHERE appid IN (SELECT appid FROM temp.merged_app)"
+    )
+    conn.execute(
+        f"""
+        INSERT INTO main.achievement (name, percent, appid)
+        SELECT name, percent, appid
+        FROM {schema}.achievement JOIN temp.merged_app USING (appid)
+        """
+    )
+
+    for table in ("achievement_stats", "app_summary"):
+        if not columns(conn, schema, table):
+            continue
+        conn.execute(
+            f"""
+            DELETE FROM main.{table}
+            WHERE appid IN (SELECT appid FROM temp.merged_app)
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO main.{table}
+            SELECT src.* FROM {schema}.{table} AS src
+            JOIN temp.merged_app USING (appid)
+            """
+        )
+
+    # errors only count for apps that haven't been stored
+    conn.execute(
+        "DELETE FROM main.appid_error WHERE appid IN (SELECT appid FROM temp.merged_app)"
+    )
+    error_columns = [
+        col
+        for col in columns(conn, "main", "appid_error")
+        if col != "pk" and col in columns(conn, schema, "appid_error")
+    ]
+    # the most recently seen error wins
+    on_conflict = "DO NOTHING"
+    if "updated" in error_columns:
+        error_updates = ", ".join(
+            f"{col} = excluded.{col}" for col in error_columns if col != "appid"
+        )
+        on_conflict = f"""DO UPDATE SET {error_updates}
+            WHERE ifnull(excluded.updated, 0) > ifnull(appid_error.updated, 0)"""
+    conn.execute(
+        f"""
+        INSERT INTO main.appid_error ({", ".join(error_columns)})
+        SELECT {", ".join(error_columns)} FROM {schema}.appid_error
+        WHERE appid NOT IN (SELECT appid FROM main.steam_app)
+        ON CONFLICT (appid) {on_conflict}
+        """
+    )
+
+    # the most recently seen alias wins
+    if columns(conn, schema, "appid_alias"):
+        conn.execute(
+            f"""
+            INSERT INTO main.appid_alias (appid, target_appid, name, updated)
+            SELECT appid, target_appid, name, updated FROM {schema}.appid_alias
+            WHERE true
+            ON CONFLICT (appid) DO UPDATE SET
+                target_appid = excluded.target_appid,
+                name = excluded.name,
+                updated = excluded.updated
+            WHERE excluded.updated > appid_alias.updated
+            """
+        )
+        conn.execute(
+            "DELETE FROM main.appid_error WHERE appid IN (SELECT appid FROM main.appid_alias)"
+        )
+
+    run_stats_columns = [
+        col for col in columns(conn, "main", "run_stats") if col != "pk"
+    ]
+    if run_stats_columns and columns(conn, schema, "run_stats"):
+        conn.execute(
+            f"""
+            INSERT INTO main.run_stats ({", ".join(run_stats_columns)})
+            SELECT {", ".join(run_stats_columns)} FROM {schema}.run_stats
+            WHERE started NOT IN (SELECT started FROM main.run_stats)
+            """
+        )
+
+    return conn.execute("SELECT count(*) FROM temp.merged_app").fetchone()[0]
+
+
+def merge_databases(target: str | Path, sources: Sequence[str | Path]) -> int:
+    """Merge all the sources into target in a single transaction"""
+    if len(sources) > MAX_SOURCES:
+        raise ValueError(f"Can merge at most {MAX_SOURCES} databases at once")
+
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        # databases can't be attached inside of a transaction
+        for i, source in enumerate(sources):
+            conn.execute(f"ATTACH DATABASE ? AS src{i}", (str(source),))
+
+        merged = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for i, source in enumerate(sources):
+                apps = merge_source(conn, f"src{i}")
+                print(f"merged {apps} apps from {source}")
+                merged += apps
+            conn.execute("DROP TABLE IF EXISTS temp.merged_app")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    return merged
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    parser.add_argument("target", help="Database to merge into")
+    parser.add_argument("sources", nargs="+", help="Databases to merge from")
+    args = parser.parse_args(argv)
+
+    for filename in (args.target, *args.sources):
+        if not Path(filename).exists():
+            print(f"{filename} doesn't exist")
+            return 2
+
+    start = time.monotonic()
+    merged = merge_databases(args.target, args.sources)
+    print(f"merged {merged} apps in {time.monotonic() - start:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+# Build the read-only database that is published to Datasette
+#
+# The crawl database is left untouched: a snapshot of it is stripped of the crawler's
+# bookkeeping tables, rebuilt with a larger page size and analyzed for the query
+# planner. Serve the result immutable, e.g.
+#   datasette inspect publish/database.db --inspect-file inspect-data.json
+#   datasette serve -i publish/database.db --inspect-file inspect-data.json
+
+import os
+import sqlite3
+import time
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+
+from snapshot import BackupRestartedError, snapshot
+
+# tables the crawler needs that aren't useful to browse
+INTERNAL_TABLES = ["appid_error", "appid_lease", "alembic_version"]
+
+# datasette's table, facet and count queries mostly scan, larger pages mean fewer
+# page reads for those at a small cost for single row lookups
+PAGE_SIZE = 8192
+
+
+def optimize(database: str | Path, page_size: int = PAGE_SIZE):
+    """Drop the internal tables, then VACUUM with page_size and ANALYZE"""
+    conn = sqlite3.connect(database, isolation_level=None)
+    try:
+        for table in INTERNAL_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        # merge the full-text index into a single segment
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'steam_app_fts'"
+        ).fetchone():
+            conn.execute(
+                "INSERT INTO steam_app_fts (steam_app_fts) VALUES ('optimize')"
+            )
+
+        # the page size can only be changed by a VACUUM outside of WAL mode
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute(f"PRAGMA page_size = {int(page_size)}")
+        conn.execute("VACUUM")
+
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+def build(source: str | Path, output: str | Path, page_size: int = PAGE_SIZE):
+    """Write the publishable copy of source to output, replaced once complete"""
+    output = Path(output)
+    partial = output.with_name(f"{output.name}.publish")
+    try:
+        # the backup api reads the source as it is, VACUUM INTO would switch it to WAL
+        snapshot(source, partial, method="backup", compact=False)
+        optimize(partial, page_size=page_size)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    os.replace(partial, output)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    parser.add_argument("source", help="Crawl database")
+    parser.add_argument(
+        "output",
+        help="Database to publish, its name is the database name in datasette "
+        "(e.g. publish/database.db)",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=PAGE_SIZE,
+        help=f"sqlite page size of the output (default: {PAGE_SIZE})",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.source).exists():
+        print("source doesn't exist")
+        return 2
+    if Path(args.source).resolve() == Path(args.output).resolve():
+        print("output must be a different file than the source")
+        return 2
+
+    start = time.monotonic()
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    try:
+        build(args.source, args.output, page_size=args.page_size)
+    except BackupRestartedError as err:
+        print(f"{err}, retry once the crawl is done")
+        return 1
+    print(
+        f"built {args.output} ({os.path.getsize(args.output) / 1024**2:.1f} MiB) "
+        f"in {time.monotonic() - start:.1f}s"
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
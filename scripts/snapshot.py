@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# Consistent copy of a database that the crawler may still be writing to
+
+import os
+import sqlite3
+import time
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+
+PAGES_PER_STEP = 1024
+STEP_SLEEP = 0.05
+# times a backup may start over because the source was written to
+MAX_RESTARTS = 10
+# seconds to wait for the writer's lock when switching the source to WAL
+BUSY_TIMEOUT = 30
+
+
+class BackupRestartedError(Exception):
+    pass
+
+
+def backup(
+    source: str | Path,
+    output: str | Path,
+    pages=PAGES_PER_STEP,
+    sleep=STEP_SLEEP,
+    max_restarts=MAX_RESTARTS,
+) -> int:
+    """Copy with sqlite's online backup api, `pages` at a time, returns its restarts
+
+    The backup sleeps `sleep` seconds between steps, holding no lock, so a writer can
+    commit in between. The backup starts over when that happens so the copy is always
+    consistent. A writer that commits more often than a full copy takes would restart
+    it forever, so this raises BackupRestartedError after max_restarts.
+    """
+    restarts = 0
+    copied = 0
+
+    def progress(status, remaining, total):
+        nonlocal restarts, copied
+        # a restarted step copies the first pages again
+        expected = min(copied + pages, total)
+        copied = total - remaining
+        if copied < expected:
+            restarts += 1
+            if restarts > max_restarts:
+                raise BackupRestartedError(
+                    f"backup restarted {restarts} times by writes to {source}"
+                )
+        if remaining:
+            time.sleep(sleep)
+
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(output)
+    try:
+        # sqlite3 only sleeps itself when a step finds the source locked
+        src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+    return restarts
+
+
+def vacuum_into(source: str | Path, output: str | Path):
+    """Compacted copy made in a single read transaction
+
+    The source is switched to WAL mode first (it stays in it), so the read
+    transaction doesn't block the writer's commits for the length of the copy.
+    """
+    src = sqlite3.connect(source, timeout=BUSY_TIMEOUT)
+    try:
+        src.execute("PRAGMA journal_mode=WAL")
+        src.execute("VACUUM INTO ?", (str(output),))
+    finally:
+        src.close()
+
+
+def vacuum(database: str | Path):
+    conn = sqlite3.connect(database)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def snapshot(
+    source: str | Path,
+    output: str | Path,
+    method: str = "vacuum",
+    compact: bool = True,
+    pages: int = PAGES_PER_STEP,
+    sleep: float = STEP_SLEEP,
+    max_restarts: int = MAX_RESTARTS,
+):
+    """Snapshot source into output, which is replaced atomically once complete"""
+    output = Path(output)
+    partial = output.with_name(f"{output.name}.partial")
+    partial.unlink(missing_ok=True)
+
+    try:
+        if method == "vacuum":
+            vacuum_into(source, partial)
+        else:
+            backup(source, partial, pages=pages, sleep=sleep, max_restarts=max_restarts)
+            if compact:
+                vacuum(partial)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    os.replace(partial, output)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    parser.add_argument("source", help="Database to snapshot")
+    parser.add_argument("output", help="Snapshot file (replaced when complete)")
+    parser.add_argument(
+        "--method",
+        choices=["vacuum", "backup"],
+        default="vacuum",
+        help="VACUUM INTO after switching the source to WAL mode (default), "
+        "or online backup in steps",
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=PAGES_PER_STEP,
+        help="pages copied per backup step",
+    )
+    parser.add_argument(
+        "--sleep",
+        type=float,
+        default=STEP_SLEEP,
+        help="seconds between backup steps, for the writer to make progress",
+    )
+    parser.add_argument(
+        "--max-restarts",
+        type=int,
+        default=MAX_RESTARTS,
+        help="give up a backup restarted this many times by the writer",
+    )
+    parser.add_argument(
+        "--no-compact",
+        dest="compact",
+        action="store_false",
+        help="don't VACUUM the backup",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.source).exists():
+        print("source doesn't exist")
+        return 2
+
+    start = time.monotonic()
+    try:
+        snapshot(
+            args.source,
+            args.output,
+            method=args.method,
+            compact=args.compact,
+            pages=args.pages,
+            sleep=args.sleep,
+            max_restarts=args.max_restarts,
+        )
+    except BackupRestartedError as err:
+        print(f"{err}, use --method vacuum")
+        return 1
+    print(f"snapshot written to {args.output} in {time.monotonic() - start:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
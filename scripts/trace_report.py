@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# Latency percentiles and slowest appids of a crawl trace (main.py --trace)
+# Request timings are broken down per host, database writes per operation
+
+import json
+import math
+from argparse import ArgumentParser
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+REQUEST_TIMINGS = ("queued", "pool", "connect", "tls", "ttfb", "total")
+
+
+def read_trace(path: str | Path) -> Iterator[dict]:
+    with open(path) as trace_file:
+        for line in trace_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def percentile(ranked: Sequence[float], p: float) -> float:
+    """Nearest rank percentile of sorted values"""
+    return ranked[max(math.ceil(p / 100 * len(ranked)) - 1, 0)]
+
+
+def timing_table(title: str, groups: dict[str, list[float]]) -> list[str]:
+    """Count, percentiles, max and total of each group of durations (in ms)"""
+    header = f"{title:<28}{'count':>8}"
+    header += "".join(f"{f'p{p:g}':>9}" for p in PERCENTILES)
+    header += f"{'max':>9}{'total (s)':>11}"
+    lines = [header]
+    for name, durations in groups.items():
+        ranked = sorted(durations)
+        if not ranked:
+            continue
+        line = f"{name:<28}{len(ranked):>8}"
+        line += "".join(f"{percentile(ranked, p) * 1000:>9.0f}" for p in PERCENTILES)
+        line += f"{ranked[-1] * 1000:>9.0f}{sum(ranked):>11.1f}"
+        lines.append(line)
+    return lines
+
+
+def tail_share(durations: Iterable[float], fraction: float = 0.01) -> float:
+    """Share of the total duration spent in the slowest fraction"""
+    ranked = sorted(durations, reverse=True)
+    total = sum(ranked)
+    if not total:
+        return 0.0
+    return sum(ranked[: max(math.ceil(len(ranked) * fraction), 1)]) / total
+
+
+def report(events: Iterable[dict], top: int = 10) -> str:
+    requests: defaultdict[str, list[float]] = defaultdict(list)
+    writes: defaultdict[str, list[float]] = defaultdict(list)
+    statuses: defaultdict[int | str, int] = defaultdict(int)
+    retries = 0
+    response_bytes = 0
+    request_totals = []
+    appid_seconds: defaultdict[int, float] = defaultdict(float)
+    appid_requests: defaultdict[int, int] = defaultdict(int)
+
+    for event in events:
+        if event["event"] == "request":
+            for timing in REQUEST_TIMINGS:
+                if event.get(timing) is not None:
+                    requests[f"{event['host']} {timing}"].append(event[timing])
+            statuses[event["status"] or event["error"]] += 1
+            retries += event["attempt"] > 1
+            response_bytes += event["bytes"]
+            request_totals.append(event["total"])
+            duration = event["queued"] + event["total"]
+        elif event["event"] == "write":
+            writes[event["op"]].append(event["duration"])
+            writes[f"{event['op']} commit"].append(event["commit"])
+            duration = event["duration"]
+        else:
+            writes[event["event"]].append(event["duration"])
+            duration = event["duration"]
+
+        if event.get("appid") is not None:
+            appid_seconds[event["appid"]] += duration
+            appid_requests[event["appid"]] += event["event"] == "request"
+
+    lines = timing_table("request (ms)", dict(sorted(requests.items())))
+    lines.append(
+        f"{len(request_totals)} requests, {retries} retries, "
+        f"{response_bytes / 1024**2:.1f} MiB, statuses: "
+        + ", ".join(f"{status}: {count}" for status, count in statuses.items())
+    )
+    lines.append(
+        f"slowest 1% of the requests took {tail_share(request_totals):.0%} "
+        "of the request time"
+    )
+    lines.append("")
+    lines += timing_table("database (ms)", dict(sorted(writes.items())))
+    lines.append("")
+    lines.append(f"slowest {top} appids (requests, rate limit waits and writes):")
+    slowest = sorted(appid_seconds.items(), key=lambda item: item[1], reverse=True)
+    for appid, seconds in slowest[:top]:
+        lines.append(f"{appid:>10}{seconds:>10.2f}s{appid_requests[appid]:>5} requests")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser()
+    parser.add_argument("trace", help="JSONL trace written by main.py --trace")
+    parser.add_argument(
+        "--top", type=int, default=10, help="number of slowest appids to list"
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.trace).exists():
+        print(f"{args.trace} doesn't exist")
+        return 2
+
+    print(report(read_trace(args.trace), args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
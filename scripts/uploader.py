@@ -4,6 +4,7 @@
 # https://github.com/dropbox/dropbox-sdk-python/blob/cc17caf7dc325708309aa52807621c6c48d7e349/example/updown.py
 
 import datetime
+import hashlib
 import os
 import time
 from argparse import ArgumentParser
@@ -11,6 +12,7 @@ from collections.abc import Sequence
 from pathlib import Path
 
 import dropbox
+import requests
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,27 +21,125 @@ load_dotenv()
 TOKEN = os.getenv("DROPBOX_ACCESS_TOKEN")
 
 
-def upload(dbx, fullname, destination, overwrite=True):
-    """Upload a file.
-    Return the request response, or None in case of error.
+# bytes sent per request of the upload session (at most 150 MiB), only concurrent
+# sessions need multiples of 4 MiB
+CHUNK_SIZE = 8 * 1024 * 1024
+# https://www.dropbox.com/developers/reference/content-hash
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+RETRIES = 5
+
+RETRY_ERRORS = (
+    requests.exceptions.RequestException,
+    dropbox.exceptions.InternalServerError,
+    dropbox.exceptions.RateLimitError,
+)
+
+
+def content_hash(fullname) -> str:
+    """Dropbox content hash of a local file, read one block at a time"""
+    block_hashes = hashlib.sha256()
+    with open(fullname, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            block_hashes.update(hashlib.sha256(block).digest())
+    return block_hashes.hexdigest()
+
+
+def remote_metadata(dbx, destination):
+    """Metadata of the remote file, None if it doesn't exist"""
+    try:
+        return dbx.files_get_metadata(destination)
+    except dropbox.exceptions.ApiError:
+        return None
+
+
+def with_retries(func, *args, wait_time: float = 1):
+    """Call func, retrying transient network and server errors with a backoff"""
+    for attempt in range(RETRIES):
+        try:
+            return func(*args)
+        except RETRY_ERRORS as err:
+            if attempt == RETRIES - 1:
+                raise
+            print(f"*** {err!r}, trying again in: {wait_time}s")
+            time.sleep(wait_time)
+            wait_time *= 2
+
+
+def correct_offset(err: dropbox.exceptions.ApiError) -> int | None:
+    """The offset dropbox expects next, if err is an incorrect offset error"""
+    error = err.error
+    # finish wraps its offset error in a lookup error
+    if getattr(error, "is_lookup_failed", lambda: False)():
+        error = error.get_lookup_failed()
+    if getattr(error, "is_incorrect_offset", lambda: False)():
+        return error.get_incorrect_offset().correct_offset
+    return None
+
+
+def read_chunk(f, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+def upload(dbx, fullname, destination, overwrite=True, chunk_size=CHUNK_SIZE):
+    """Upload a file in chunks with an upload session.
+    Skips the upload if the remote file has the same content hash.
+    Return the request response (the remote metadata when skipped), or None in case of error.
     """
+    local_hash = content_hash(fullname)
+    metadata = remote_metadata(dbx, destination)
+    if getattr(metadata, "content_hash", None) == local_hash:
+        print(f"{destination} is unchanged, skipping upload")
+        return metadata
+
     mode = (
         dropbox.files.WriteMode.overwrite if overwrite else dropbox.files.WriteMode.add
     )
     mtime = os.path.getmtime(fullname)
-    with open(fullname, "rb") as f:
-        data = f.read()
+    commit = dropbox.files.CommitInfo(
+        path=destination,
+        mode=mode,
+        client_modified=datetime.datetime(*time.gmtime(mtime)[:6]),
+        mute=True,
+    )
+    size = os.path.getsize(fullname)
+
     try:
-        res = dbx.files_upload(
-            data,
-            destination,
-            mode,
-            client_modified=datetime.datetime(*time.gmtime(mtime)[:6]),
-            mute=True,
-        )
-    except dropbox.exceptions.ApiError as err:
+        with open(fullname, "rb") as f:
+            session_id = with_retries(
+                lambda: (
+                    dbx.files_upload_session_start(
+                        read_chunk(f, 0, chunk_size)
+                    ).session_id
+                )
+            )
+            offset = min(chunk_size, size)
+            while True:
+                cursor = dropbox.files.UploadSessionCursor(
+                    session_id=session_id, offset=offset
+                )
+                chunk = read_chunk(f, offset, chunk_size)
+                try:
+                    if offset + len(chunk) < size:
+                        with_retries(dbx.files_upload_session_append_v2, chunk, cursor)
+                        offset += len(chunk)
+                    else:
+                        res = with_retries(
+                            dbx.files_upload_session_finish, chunk, cursor, commit
+                        )
+                        break
+                except dropbox.exceptions.ApiError as err:
+                    # a retried chunk may have already arrived, resume where dropbox is
+                    if (offset := correct_offset(err)) is None:
+                        raise
+                    print(f"resuming upload at offset {offset}")
+    except (dropbox.exceptions.ApiError, *RETRY_ERRORS) as err:
         print("*** API error", err)
         return None
+
+    if res.content_hash != local_hash:
+        print("*** content hash mismatch after upload")
+        return None
     print("uploaded as", res.name.encode("utf8"))
     return res
 
@@ -3,9 +3,16 @@ __version__ = "0.1.0"
 
 # global constants
 
-# limit is 10 req/10 sec so we batch in groups of 5 and then delay by 5 secs
+# apps requested (and stored) together
 BATCH_SIZE = 5
 
+# requests per second and burst size for each host, hosts have independent quotas
+# the store limit is 10 req/10 sec
+RATE_LIMITS = {
+    "store.steampowered.com": (1, 5),
+    "api.steampowered.com": (1, 5),
+}
+
 APPIDS_URL = "https://api.steampowered.com/ISteamApps/GetAppList/v0002/?format=json"
 APPID_URL = "https://store.steampowered.com/api/appdetails/?appids={}&l=english"
 ACHIEVEMENT_URL = "https://api.steampowered.com/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v2/?gameid={}&format=json"
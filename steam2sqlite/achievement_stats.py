@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""Per app statistics of the achievement percentages
+
+The crawler updates the statistics of the apps whose achievements it stores, run this
+module to compute them for every app with one statement (the app summaries are
+rebuilt with them):
+    python steam2sqlite/achievement_stats.py database.db
+"""
+
+import time
+from argparse import ArgumentParser
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import bindparam, text
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import app_summary
+from steam2sqlite.models import SteamApp
+
+# achievements earned by fewer players (in percent) are rare
+RARE_PERCENT = 1.0
+
+# percentages are clamped to this in the difficulty, as 0 would be infinitely hard
+MIN_PERCENT = 0.01
+
+# apps updated per statement
+BATCH_SIZE = 1000
+
+# difficulty is the mean of -log10(percent / 100): 0 when every player has every
+# achievement, 1 when the typical achievement is earned by 10% of the players, 2 by
+# 1%, and so on. The median is the mean of the middle ranks (one of them when odd).
+INSERT_SQL = f"""
+    INSERT INTO achievement_stats (
+        appid, achievements, min_percent, median_percent, mean_percent, max_percent,
+        rare_achievements, rarest_achievement, difficulty
+    )
+    SELECT
+        appid,
+        count(*),
+        min(percent),
+        avg(CASE WHEN rank IN ((total + 1) / 2, (total + 2) / 2) THEN percent END),
+        avg(percent),
+        max(percent),
+        sum(percent < {RARE_PERCENT}),
+        max(CASE WHEN rank = 1 THEN name END),
+        avg(-log10(max(percent, {MIN_PERCENT}) / 100))
+    FROM (
+        SELECT
+            appid,
+            name,
+            percent,
+            row_number() OVER (PARTITION BY appid ORDER BY percent, pk) AS rank,
+            count(*) OVER (PARTITION BY appid) AS total
+        FROM achievement WHERE appid IS NOT NULL {{where}}
+    )
+    GROUP BY appid
+"""
+
+UPDATE_SQL = text(INSERT_SQL.format(where="AND appid IN :appids")).bindparams(
+    bindparam("appids", expanding=True)
+)
+
+DELETE_SQL = text("DELETE FROM achievement_stats WHERE appid IN :appids").bindparams(
+    bindparam("appids", expanding=True)
+)
+
+
+def update_apps_stats(session: Session, apps: Iterable[SteamApp]):
+    """Update the statistics of apps from their stored achievements"""
+    session.flush()
+    appids = [app.appid for app in apps]
+    for start in range(0, len(appids), BATCH_SIZE):
+        batch = {"appids": appids[start : start + BATCH_SIZE]}
+        # apps without achievements are left without statistics
+        session.execute(DELETE_SQL, batch)
+        session.execute(UPDATE_SQL, batch)
+
+
+def backfill(session: Session) -> int:
+    """Recompute the statistics and summary of every app in a single transaction"""
+    session.flush()
+    start = time.monotonic()
+    session.execute(text("DELETE FROM achievement_stats"))
+    apps = session.execute(text(INSERT_SQL.format(where=""))).rowcount
+    logger.info(
+        f"Computed the statistics of {apps} apps in {time.monotonic() - start:.1f}s"
+    )
+    app_summary.backfill(session, commit=False)
+    session.commit()
+    return apps
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser(description="Recompute the achievement statistics")
+    parser.add_argument("database", help="Database to update")
+    args = parser.parse_args(argv)
+
+    if not Path(args.database).exists():
+        logger.error(f"{args.database} doesn't exist")
+        return 2
+
+    engine = create_engine(f"sqlite:///{args.database}", echo=False)
+    with Session(engine) as session:
+        apps = backfill(session)
+    logger.info(f"Stored the achievement statistics of {apps} apps")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
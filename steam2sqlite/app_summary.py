@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""Each app in one row of app_summary, with its genres, categories and achievements
+
+The crawler refreshes the summary of the apps it stores in the transaction that
+stores them, run this module to rebuild it for every app with one statement:
+    python steam2sqlite/app_summary.py database.db
+"""
+
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import bindparam, text
+from sqlmodel import Session, create_engine
+
+# apps refreshed per statement
+BATCH_SIZE = 1000
+
+LINKS_SQL = """(
+    SELECT json_group_array(description) FROM (
+        SELECT {link}.description FROM {link_table} AS link
+        JOIN {link} ON {link}.pk = link.{link}_pk
+        WHERE link.appid = steam_app.appid
+        ORDER BY {link}.id
+    )
+)"""
+
+# app_summary column: its value for a row of steam_app joined to its achievement_stats
+COLUMNS = {
+    "appid": "steam_app.appid",
+    "name": "steam_app.name",
+    "type": "steam_app.type",
+    "is_free": "steam_app.is_free",
+    "controller_support": "steam_app.controller_support",
+    "metacritic_score": "steam_app.metacritic_score",
+    "recommendations": "steam_app.recommendations",
+    "release_date": "steam_app.release_date",
+    "initial_price": "steam_app.initial_price",
+    "current_price": "steam_app.current_price",
+    "genres": LINKS_SQL.format(link="genre", link_table="genresteammapplink"),
+    "categories": LINKS_SQL.format(link="category", link_table="categorysteamapplink"),
+    "achievements": "coalesce(achievement_stats.achievements, 0)",
+    "median_percent": "achievement_stats.median_percent",
+    "rare_achievements": "achievement_stats.rare_achievements",
+    "difficulty": "achievement_stats.difficulty",
+    "updated": "steam_app.updated",
+}
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO app_summary ({", ".join(COLUMNS)})
+    SELECT {", ".join(COLUMNS.values())}
+    FROM steam_app LEFT JOIN achievement_stats USING (appid)
+"""
+
+REFRESH_SQL = text(f"{INSERT_SQL} WHERE steam_app.appid IN :appids").bindparams(
+    bindparam("appids", expanding=True)
+)
+
+
+def refresh_apps(session: Session, appids: Sequence[int]):
+    """Rebuild the summary of appids from their rows, in the session's transaction"""
+    session.flush()
+    for start in range(0, len(appids), BATCH_SIZE):
+        session.execute(
+            REFRESH_SQL, {"appids": list(appids[start : start + BATCH_SIZE])}
+        )
+
+
+def backfill(session: Session, commit: bool = True) -> int:
+    """Rebuild the summary of every app in a single transaction"""
+    session.flush()
+    session.execute(text("DELETE FROM app_summary"))
+    apps = session.execute(text(INSERT_SQL)).rowcount
+    if commit:
+        session.commit()
+    return apps
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = ArgumentParser(description="Rebuild the app summaries")
+    parser.add_argument("database", help="Database to update")
+    args = parser.parse_args(argv)
+
+    if not Path(args.database).exists():
+        logger.error(f"{args.database} doesn't exist")
+        return 2
+
+    engine = create_engine(f"sqlite:///{args.database}", echo=False)
+    with Session(engine) as session:
+        apps = backfill(session)
+    logger.info(f"Stored the summaries of {apps} apps")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
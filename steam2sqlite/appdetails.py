@@ -0,0 +1,107 @@
+"""The SteamApp columns read from appdetails data
+
+APP_FIELDS is the one place a column is mapped: parse_app_data is built from it, and
+so is APPDETAILS_FILTERS, the sections of the data that are read. The filters are
+sent with the appdetails requests so the store leaves out the descriptions,
+screenshots, movies and the other sections that aren't stored.
+
+To store another column, add it to SteamApp (with its migration) and its Field here.
+"""
+
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from steam2sqlite import APPID_URL
+
+
+class Field(NamedTuple):
+    """Where a column's value is in appdetails data
+
+    path: keys from the data to the value
+    section: the filters section the value is sent in, "basic" for the type, name
+        and other top level values
+    default: value when the path isn't in the data
+    parse: converts the value found
+    required: raise a KeyError rather than use the default
+    """
+
+    path: tuple[str, ...]
+    section: str
+    default: Any = None
+    parse: Callable[[Any], Any] | None = None
+    required: bool = False
+
+
+def parse_release_date(release_date: dict) -> date | None:
+    """The date of a released app, None while it's coming soon"""
+    if release_date.get("coming_soon") or not release_date.get("date"):
+        return None
+    try:
+        return datetime.strptime(release_date["date"], "%b %d, %Y").date()
+    except ValueError:
+        logger.warning(f"Unparseable release date: {release_date['date']!r}")
+        return None
+
+
+APP_FIELDS = {
+    "appid": Field(("steam_appid",), "basic", required=True),
+    "type": Field(("type",), "basic", required=True),
+    "is_free": Field(("is_free",), "basic"),
+    "name": Field(("name",), "basic", required=True),
+    "controller_support": Field(("controller_support",), "basic"),
+    "metacritic_score": Field(("metacritic", "score"), "metacritic"),
+    "metacritic_url": Field(("metacritic", "url"), "metacritic"),
+    "recommendations": Field(("recommendations", "total"), "recommendations"),
+    "achievements_total": Field(("achievements", "total"), "achievements", default=0),
+    "release_date": Field(("release_date",), "release_date", parse=parse_release_date),
+    "initial_price": Field(("price_overview", "initial"), "price_overview"),
+    "current_price": Field(("price_overview", "final"), "price_overview"),
+}
+
+# sections of the genres and categories linked to the app
+LINK_SECTIONS = ("genres", "categories")
+
+APPDETAILS_FILTERS = ",".join(
+    dict.fromkeys([field.section for field in APP_FIELDS.values()] + [*LINK_SECTIONS])
+)
+
+
+def field_reader(field: Field) -> Callable[[dict], Any]:
+    """Function reading field's value from appdetails data"""
+
+    def read(data: dict) -> Any:
+        value: Any = data
+        for key in field.path:
+            if not isinstance(value, dict) or key not in value:
+                if field.required:
+                    raise KeyError(key)
+                return field.default
+            value = value[key]
+        return field.parse(value) if field.parse and value is not None else value
+
+    return read
+
+
+_readers = {column: field_reader(field) for column, field in APP_FIELDS.items()}
+
+
+def parse_app_data(data: dict) -> dict:
+    """SteamApp attributes of appdetails data"""
+    return {column: read(data) for column, read in _readers.items()}
+
+
+def parse_links(data: dict, key: str) -> list[dict]:
+    """The deduplicated "genres" or "categories" of appdetails data"""
+    return list({v["id"]: v for v in data.get(key) or []}.values())
+
+
+def is_coming_soon(data: dict) -> bool:
+    return bool((data.get("release_date") or {}).get("coming_soon"))
+
+
+def appdetails_url(appid: int) -> str:
+    """appdetails url of appid, with only the sections that are read"""
+    return f"{APPID_URL.format(appid)}&filters={APPDETAILS_FILTERS}"
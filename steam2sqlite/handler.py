@@ -1,15 +1,34 @@
 import asyncio
 import json
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import httpx
 import sqlalchemy.exc
 from loguru import logger
-from sqlmodel import Session, select
-
-from steam2sqlite import ACHIEVEMENT_URL, APPID_URL, BATCH_SIZE, navigator, utils
-from steam2sqlite.models import Achievement, AppidError, Category, Genre, SteamApp
+from sqlmodel import Session, or_, select
+
+from steam2sqlite import (
+    ACHIEVEMENT_URL,
+    achievement_stats,
+    app_summary,
+    navigator,
+    schedule,
+)
+from steam2sqlite.appdetails import (
+    appdetails_url,
+    is_coming_soon,
+    parse_app_data,
+    parse_links,
+)
+from steam2sqlite.models import (
+    Achievement,
+    AppidAlias,
+    AppidError,
+    Category,
+    Genre,
+    SteamApp,
+)
 
 
 class DataParsingError(Exception):
@@ -18,6 +37,17 @@ class DataParsingError(Exception):
         self.reason = reason
 
 
+class AppidAliasError(DataParsingError):
+    """The appid's details are those of another app"""
+
+    def __init__(self, appid: int, target_appid: int):
+        super().__init__(
+            appid,
+            reason=f"duplicate entry with current appid {appid} and steam appid: {target_appid}",
+        )
+        self.target_appid = target_appid
+
+
 def get_or_create(session, model, **kwargs):
     instance = session.query(model).filter_by(**kwargs).first()
     if instance:
@@ -47,37 +77,68 @@ def update_or_create(session, model, filterargs, **kwargs):
 
 
 def attach_achievements_to_app(
-    session: Session, app_achievements_dict: list[dict], app: SteamApp
+    session: Session,
+    app_achievements_dict: list[dict],
+    app: SteamApp,
+    commit: bool = True,
 ):
+    # match on name against the app's achievements, loaded once instead of a query
+    # per achievement
+    stored: dict[str, Achievement] = {}
+    for achievement in app.achievements:
+        if achievement.name in stored:
+            raise sqlalchemy.exc.MultipleResultsFound(
+                f"duplicate achievement {achievement.name} for appid {app.appid}"
+            )
+        stored[achievement.name] = achievement
+
     for achievement_dict in app_achievements_dict:
-        achievement_args = achievement_dict | {"steam_app": app}  # joining dicts
-        update_or_create(
-            session,
-            Achievement,
-            {"steam_app": app, "name": achievement_dict["name"]},
-            **achievement_args,
-        )
+        achievement = stored.get(achievement_dict["name"])
+        if achievement is None:
+            achievement = Achievement(**achievement_dict)
+            app.achievements.append(achievement)
+            stored[achievement.name] = achievement
+        else:
+            for key, value in achievement_dict.items():
+                setattr(achievement, key, value)
 
-    session.commit()
+    if commit:
+        session.commit()
 
 
 def clear_and_store_achievements(
-    session: Session, app_achievements_dict: list[dict], app: SteamApp
+    session: Session,
+    app_achievements_dict: list[dict],
+    app: SteamApp,
+    commit: bool = True,
 ):
     app.achievements = []
-    session.commit()
-    session.refresh(app)
+    if commit:
+        session.commit()
+        session.refresh(app)
+    else:
+        session.flush()
 
     for achievement_dict in app_achievements_dict:
         inst = Achievement(**achievement_dict)
         app.achievements.append(inst)
-    session.commit()
+    if commit:
+        session.commit()
 
 
-def get_apps_achievements(apps: list[SteamApp]) -> list[tuple[SteamApp, list[dict]]]:
-    urls = [ACHIEVEMENT_URL.format(app.appid) for app in apps]
-    responses = asyncio.run(navigator.make_requests(urls))
+def parse_achievements(data: dict) -> list[dict] | None:
+    """Achievements of an achievement percentages response, None if it has none"""
+    if (
+        "achievementpercentages" in data
+        and "achievements" in data["achievementpercentages"]
+    ):
+        return data["achievementpercentages"]["achievements"]
+    return None
 
+
+def parse_apps_achievements(
+    apps: list[SteamApp], responses: list[httpx.Response]
+) -> list[tuple[SteamApp, list[dict]]]:
     apps_achievements_data = []
     for app, resp in zip(apps, responses):
         # make_requests inserts exceptions into the responses list
@@ -91,105 +152,98 @@ def get_apps_achievements(apps: list[SteamApp]) -> list[tuple[SteamApp, list[dic
             logger.error(f"Error getting achievements for appid: {app.appid}")
             continue
 
-        if (
-            "achievementpercentages" in data
-            and "achievements" in data["achievementpercentages"]
-        ):
-            apps_achievements_data.append(
-                (app, data["achievementpercentages"]["achievements"])
-            )
+        achievements = parse_achievements(data)
+        if achievements is not None:
+            apps_achievements_data.append((app, achievements))
         else:
             logger.error(f"Error getting achievements for appid: {app.appid}")
 
     return apps_achievements_data
 
 
+def get_apps_achievements(apps: list[SteamApp]) -> list[tuple[SteamApp, list[dict]]]:
+    urls = [ACHIEVEMENT_URL.format(app.appid) for app in apps]
+    responses = asyncio.run(navigator.make_requests(urls))
+    return parse_apps_achievements(apps, responses)
+
+
 def store_apps_achievements(
-    session: Session, apps_achievements_data: list[tuple[SteamApp, list[dict]]]
+    session: Session,
+    apps_achievements_data: list[tuple[SteamApp, list[dict]]],
+    commit: bool = True,
 ):
+    now = datetime.utcnow()
     for app_achievement_data in apps_achievements_data:
         app, achievement_data = app_achievement_data
+        changed = schedule.achievements_changed(app.achievements, achievement_data)
+        schedule.reschedule_achievements(app, changed, now)
         try:
-            attach_achievements_to_app(session, achievement_data, app)
+            attach_achievements_to_app(session, achievement_data, app, commit=commit)
         except sqlalchemy.exc.MultipleResultsFound:
             # clear out achievements and store them fresh
-            clear_and_store_achievements(session, achievement_data, app)
-
-
-def load_app_into_db(session: Session, data: dict) -> SteamApp:
-    genres_data = data.get("genres") or []
-    if genres_data:
-        # deduplicate
-        genres_data = list({v["id"]: v for v in genres_data}.values())
-    genres = [get_or_create(session, Genre, **dd) for dd in genres_data]
-
-    categories_data = data.get("categories") or []
-    if categories_data:
-        # deduplicate
-        categories_data = list({v["id"]: v for v in categories_data}.values())
-    categories = [get_or_create(session, Category, **dd) for dd in categories_data]
-
-    metacritic_score, metacritic_url = None, None
-    if "metacritic" in data:
-        metacritic_score = data["metacritic"].get("score")
-        metacritic_url = data["metacritic"].get("url")
-
-    recommendations_total = None
-    if "recommendations" in data:
-        recommendations_total = data["recommendations"].get("total")
-
-    achievements_total = 0
-    if "achievements" in data:
-        achievements_total = data["achievements"].get("total", 0)
-
-    release_date = None
-    if "release_date" in data and not (
-        "coming_soon" in data["release_date"] and data["release_date"]["coming_soon"]
-    ):
-        release_date_str = data["release_date"].get("date")
-        try:
-            if release_date_str:
-                release_date = datetime.strptime(release_date_str, "%b %d, %Y").date()
-        except ValueError:
-            # TODO: log this error
-            pass
-
-    initial_price = current_price = None
-    if "price_overview" in data:
-        initial_price = data["price_overview"].get("initial")
-        current_price = data["price_overview"].get("final")
-
-    app_attrs = {
-        "appid": data["steam_appid"],
-        "type": data["type"],
-        "is_free": data.get("is_free"),
-        "name": data["name"],
-        "controller_support": data.get("controller_support"),
-        "metacritic_score": metacritic_score,
-        "metacritic_url": metacritic_url,
-        "recommendations": recommendations_total,
-        "achievements_total": achievements_total,
-        "release_date": release_date,
-        "initial_price": initial_price,
-        "current_price": current_price,
-    }
+            clear_and_store_achievements(session, achievement_data, app, commit=commit)
+
+    apps = [app for app, _ in apps_achievements_data]
+    achievement_stats.update_apps_stats(session, apps)
+    app_summary.refresh_apps(session, [app.appid for app in apps])
+    if commit:
+        session.commit()
+
+
+def build_app(data: dict) -> SteamApp:
+    """SteamApp of appdetails data with its genres and categories, outside of any
+    database"""
+    app = SteamApp(**parse_app_data(data))
+    app.genres = [Genre(**genre) for genre in parse_links(data, "genres")]
+    app.categories = [
+        Category(**category) for category in parse_links(data, "categories")
+    ]
+    return app
+
+
+def load_app_into_db(session: Session, data: dict, commit: bool = True) -> SteamApp:
+    """Normalize appdetails data into the app and its genres and categories
+
+    With commit False the app is only added to the session, to be committed with
+    others.
+    """
+    genres = [get_or_create(session, Genre, **dd) for dd in parse_links(data, "genres")]
+    categories = [
+        get_or_create(session, Category, **dd) for dd in parse_links(data, "categories")
+    ]
+
+    app_attrs = parse_app_data(data)
     steam_app = update_or_create(
         session, SteamApp, {"appid": data["steam_appid"]}, **app_attrs
     )
+    # refresh the achievements right away when their number changes
+    if sqlalchemy.inspect(steam_app).attrs.achievements_total.history.has_changes():
+        steam_app.achievements_due = None
 
+    # loading the current categories and genres autoflushes the changes made so far
+    changed = sqlalchemy.inspect(steam_app).transient or session.is_modified(steam_app)
     steam_app.categories = categories
     steam_app.genres = genres
+    changed = changed or session.is_modified(steam_app)
 
-    steam_app.updated = datetime.utcnow()
+    now = datetime.utcnow()
+    new = schedule.is_new(app_attrs["release_date"], is_coming_soon(data), now)
+    schedule.reschedule_refresh(steam_app, changed, now, new=new)
+
+    steam_app.updated = now
 
     session.add(steam_app)
-    session.commit()
-    session.refresh(steam_app)
+    app_summary.refresh_apps(session, [steam_app.appid])
+    if commit:
+        session.commit()
+        session.refresh(steam_app)
 
     return steam_app
 
 
-def import_single_app(session: Session, item: dict) -> SteamApp:
+def get_app_data(item: dict) -> dict:
+    """The data of an appdetails response, raises DataParsingError when it has none
+    or AppidAliasError when it's another app's"""
     appid = list(item.keys())[0]
     if item[appid]["success"] is False:
         raise DataParsingError(int(appid), reason="Response from api: success=False")
@@ -197,22 +251,44 @@ def import_single_app(session: Session, item: dict) -> SteamApp:
     data = item[appid]["data"]
 
     if int(appid) != data["steam_appid"]:
-        raise DataParsingError(
-            int(appid),
-            reason=f"duplicate entry with current appid {appid} and steam appid: {data['steam_appid']}",
-        )
+        raise AppidAliasError(int(appid), data["steam_appid"])
+
+    return data
+
+
+def import_single_app(session: Session, item: dict, commit: bool = True) -> SteamApp:
+    appid = list(item.keys())[0]
+    data = get_app_data(item)
 
     try:
-        app = load_app_into_db(session, data)
+        app = load_app_into_db(session, data, commit=commit)
     except (sqlite3.DatabaseError, sqlalchemy.exc.IntegrityError) as e:
         raise DataParsingError(int(appid), reason=f"Database error: {e}")
 
     return app
 
 
-def get_appids_from_db(session: Session) -> list[tuple[int, datetime]]:
+def get_appids_from_db(session: Session) -> list[tuple[int, datetime | None]]:
+    """appids with when they're due for a refresh, soonest first"""
     return session.exec(
-        select(SteamApp.appid, SteamApp.updated).order_by(SteamApp.updated.asc())  # type: ignore
+        select(SteamApp.appid, SteamApp.refresh_due).order_by(
+            SteamApp.refresh_due.asc()  # type: ignore
+        )
+    ).all()
+
+
+def get_achievements_due_appids(session: Session, now: datetime) -> list[int]:
+    """appids with achievements that are due for a refresh, soonest first"""
+    return session.exec(
+        select(SteamApp.appid)
+        .where(SteamApp.achievements_total > 0)
+        .where(
+            or_(
+                SteamApp.achievements_due.is_(None),  # type: ignore
+                SteamApp.achievements_due <= now,
+            )
+        )
+        .order_by(SteamApp.achievements_due.asc())  # type: ignore
     ).all()
 
 
@@ -220,21 +296,96 @@ def get_error_appids(session: Session) -> list[int]:
     return session.exec(select(AppidError.appid)).all()
 
 
-def record_appid_error(
-    session, appid: int, name: str | None = None, reason: str | None = None
+def get_retry_appids(session: Session, now: datetime) -> list[int]:
+    """appids of errors that are due to be retried, longest waiting first"""
+    retry_before = now - timedelta(days=schedule.ERROR_RETRY_INTERVAL)
+    return session.exec(
+        select(AppidError.appid)
+        .where(
+            or_(
+                AppidError.updated.is_(None),  # type: ignore
+                AppidError.updated <= retry_before,
+            )
+        )
+        .order_by(AppidError.updated.asc())  # type: ignore
+    ).all()
+
+
+def get_appid_aliases(session: Session) -> dict[int, int]:
+    return dict(session.exec(select(AppidAlias.appid, AppidAlias.target_appid)).all())
+
+
+def resolve_aliases(
+    session: Session, steam_appids_names: dict[int, str]
+) -> dict[int, str]:
+    """Replace the aliased appids by the apps they resolve to"""
+    aliases = get_appid_aliases(session)
+    resolved = {
+        appid: name
+        for appid, name in steam_appids_names.items()
+        if appid not in aliases
+    }
+    for appid, target_appid in aliases.items():
+        if appid in steam_appids_names:
+            resolved.setdefault(target_appid, steam_appids_names[appid])
+    return resolved
+
+
+def record_appid_alias(
+    session: Session,
+    appid: int,
+    target_appid: int,
+    name: str | None = None,
+    commit: bool = True,
 ):
-    get_or_create(session, AppidError, appid=appid, name=name, reason=reason)
-    session.commit()
+    alias = update_or_create(
+        session,
+        AppidAlias,
+        {"appid": appid},
+        appid=appid,
+        target_appid=target_appid,
+        name=name,
+    )
+    alias.updated = datetime.utcnow()
+    session.add(alias)
+    if commit:
+        session.commit()
+    clear_appid_error(session, appid, commit=commit)
 
 
-# delay for rate limiting
-@utils.delay_by(BATCH_SIZE)
-def get_apps_data(
-    session: Session, steam_appids_names: dict[int, str], appids: list[int]
+def record_appid_error(
+    session,
+    appid: int,
+    name: str | None = None,
+    reason: str | None = None,
+    commit: bool = True,
+):
+    error = update_or_create(
+        session, AppidError, {"appid": appid}, appid=appid, name=name, reason=reason
+    )
+    error.updated = datetime.utcnow()
+    session.add(error)
+    if commit:
+        session.commit()
+
+
+def clear_appid_error(session: Session, appid: int, commit: bool = True):
+    """Forget the error of an appid that has been stored since"""
+    error = session.exec(
+        select(AppidError).where(AppidError.appid == appid)
+    ).one_or_none()
+    if error:
+        session.delete(error)
+        if commit:
+            session.commit()
+
+
+def parse_apps_data(
+    session: Session,
+    steam_appids_names: dict[int, str],
+    appids: list[int],
+    responses: list[httpx.Response],
 ) -> list[dict]:
-    urls = [APPID_URL.format(appid) for appid in appids if appid is not None]
-    responses = asyncio.run(navigator.make_requests(urls))
-
     apps_data = []
     for appid, resp in zip(appids, responses, strict=False):
         # make_requests inserts exceptions into the responses list
@@ -253,17 +404,64 @@ def get_apps_data(
     return apps_data
 
 
+def get_apps_data(
+    session: Session, steam_appids_names: dict[int, str], appids: list[int]
+) -> list[dict]:
+    urls = [appdetails_url(appid) for appid in appids if appid is not None]
+    responses = asyncio.run(navigator.make_requests(urls))
+    return parse_apps_data(session, steam_appids_names, appids, responses)
+
+
+def get_apps_data_and_achievements(
+    session: Session,
+    steam_appids_names: dict[int, str],
+    appids: list[int],
+    apps: list[SteamApp],
+) -> tuple[list[dict], list[tuple[SteamApp, list[dict]]]]:
+    """get_apps_data of appids and get_apps_achievements of apps, made concurrently
+
+    Both hosts are rate limited separately by the navigator, so the achievements
+    don't slow down the app data requests.
+    """
+    app_urls = [appdetails_url(appid) for appid in appids if appid is not None]
+    achievement_urls = [ACHIEVEMENT_URL.format(app.appid) for app in apps]
+    responses = asyncio.run(navigator.make_requests(app_urls + achievement_urls))
+
+    apps_data = parse_apps_data(
+        session, steam_appids_names, appids, responses[: len(app_urls)]
+    )
+    apps_achievements_data = parse_apps_achievements(apps, responses[len(app_urls) :])
+    return apps_data, apps_achievements_data
+
+
 def store_apps_data(
-    session: Session, steam_appids_names: dict[int, str], apps_data: list[dict]
+    session: Session,
+    steam_appids_names: dict[int, str],
+    apps_data: list[dict],
+    commit: bool = True,
 ) -> list[SteamApp]:
     apps = []
     for app_data in apps_data:
         try:
-            app = import_single_app(session, app_data)
+            app = import_single_app(session, app_data, commit=commit)
+            clear_appid_error(session, app.appid, commit=commit)
             apps.append(app)
+        except AppidAliasError as e:
+            logger.info(f"appid {e.appid} is an alias of {e.target_appid}")
+            record_appid_alias(
+                session,
+                e.appid,
+                e.target_appid,
+                steam_appids_names.get(e.appid),
+                commit=commit,
+            )
         except DataParsingError as e:
             logger.error(f"Error for appid: {e.appid}, reason: {e.reason}")
             record_appid_error(
-                session, e.appid, steam_appids_names.get(e.appid, "unknown"), e.reason
+                session,
+                e.appid,
+                steam_appids_names.get(e.appid, "unknown"),
+                e.reason,
+                commit=commit,
             )
     return apps
@@ -0,0 +1,163 @@
+"""Import archived appdetails and achievement responses without crawling
+
+A source is a directory of responses saved as <appid>.json and
+<appid>_achievements.json (like test_data/), or a JSONL file of responses, one per
+line. Achievement responses in JSONL carry the appid they're for:
+    {"620": {"success": true, "data": {...}}}
+    {"appid": 620, "achievementpercentages": {"achievements": [...]}}
+"""
+
+import json
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from pathlib import Path
+
+import sqlalchemy.exc
+from loguru import logger
+from sqlmodel import Session, select
+
+from steam2sqlite.handler import (
+    record_appid_error,
+    store_apps_achievements,
+    store_apps_data,
+)
+from steam2sqlite.models import AppidError, RunStats, SteamApp
+
+# responses written per transaction
+BATCH_SIZE = 500
+
+# ("app" or "achievements", appid, response)
+Payload = tuple[str, int, dict]
+
+
+def read_directory(path: Path) -> Iterator[Payload]:
+    """<appid>.json responses in appid order, each followed by its achievements"""
+    appids = sorted(
+        int(file.stem) for file in path.glob("*.json") if file.stem.isdigit()
+    )
+    for appid in appids:
+        yield "app", appid, json.loads((path / f"{appid}.json").read_text())
+        achievements_file = path / f"{appid}_achievements.json"
+        if achievements_file.exists():
+            yield "achievements", appid, json.loads(achievements_file.read_text())
+
+
+def read_jsonl(path: Path) -> Iterator[Payload]:
+    with open(path) as jsonl_file:
+        for line in jsonl_file:
+            if not line.strip():
+                continue
+            response = json.loads(line)
+            if "achievementpercentages" in response:
+                yield "achievements", int(response["appid"]), response
+            else:
+                yield "app", int(next(iter(response))), response
+
+
+def read_source(path: Path) -> Iterator[Payload]:
+    return read_directory(path) if path.is_dir() else read_jsonl(path)
+
+
+def import_batch(
+    session: Session, batch: list[Payload], commit: bool = False
+) -> Counter[str]:
+    """Store a batch of responses, committed together unless commit is True
+
+    The apps are stored before the achievements, achievements of apps that aren't in
+    the database are skipped.
+    """
+    appids = [appid for kind, appid, _ in batch if kind == "app"]
+    apps_data = [response for kind, _, response in batch if kind == "app"]
+    apps = store_apps_data(session, {}, apps_data, commit=commit)
+    # the apps that weren't stored are either aliases or have an error recorded
+    stored = {app.appid for app in apps}
+    errors = session.exec(
+        select(AppidError.appid).where(
+            AppidError.appid.in_([appid for appid in appids if appid not in stored])
+        )
+    ).all()
+
+    apps_achievements_data = []
+    skipped = 0
+    for kind, appid, response in batch:
+        if kind != "achievements":
+            continue
+        app = session.get(SteamApp, appid)
+        achievements = (response.get("achievementpercentages") or {}).get(
+            "achievements"
+        )
+        if app is None or achievements is None:
+            skipped += 1
+            continue
+        apps_achievements_data.append((app, achievements))
+    store_apps_achievements(session, apps_achievements_data, commit=commit)
+    session.commit()
+
+    return Counter(
+        apps=len(apps),
+        aliases=len(apps_data) - len(apps) - len(errors),
+        errors=len(errors),
+        achievements=sum(
+            len(achievements) for _, achievements in apps_achievements_data
+        ),
+        skipped=skipped,
+    )
+
+
+def import_payload(session: Session, payload: Payload) -> Counter[str]:
+    """Store a single response, recording the app's error if the database rejects it"""
+    kind, appid, _ = payload
+    try:
+        return import_batch(session, [payload], commit=True)
+    except sqlalchemy.exc.SQLAlchemyError as e:
+        session.rollback()
+        logger.error(f"Error importing {kind} of appid: {appid}, reason: {e}")
+        if kind == "achievements":
+            return Counter(skipped=1)
+        record_appid_error(session, appid, reason=f"import failed: {e}")
+        return Counter(errors=1)
+
+
+def import_payloads(
+    session: Session, payloads: Iterable[Payload], batch_size: int = BATCH_SIZE
+) -> Counter[str]:
+    counts: Counter[str] = Counter()
+    start = time.monotonic()
+    payloads = iter(payloads)
+    while batch := list(islice(payloads, batch_size)):
+        try:
+            counts += import_batch(session, batch)
+        except sqlalchemy.exc.SQLAlchemyError:
+            # a database error spoils the whole transaction, redo the batch one by one
+            session.rollback()
+            logger.warning("Batch failed, importing its responses one at a time")
+            for payload in batch:
+                counts += import_payload(session, payload)
+
+        rows = counts["apps"] + counts["achievements"]
+        logger.info(
+            f"Imported {counts['apps']} apps ({counts['aliases']} aliases, "
+            f"{counts['errors']} errors), "
+            f"{counts['achievements']} achievements, "
+            f"{rows / (time.monotonic() - start):.0f} rows/s"
+        )
+    return counts
+
+
+def import_sources(
+    session: Session,
+    sources: Iterable[Path],
+    run_stats: RunStats,
+    batch_size: int = BATCH_SIZE,
+):
+    for source in sources:
+        logger.info(f"Importing {source}")
+        counts = import_payloads(session, read_source(source), batch_size)
+        run_stats.apps_fetched += counts["apps"] + counts["aliases"] + counts["errors"]
+        run_stats.apps_stored += counts["apps"]
+        run_stats.apps_errored += counts["errors"]
+        run_stats.achievements_stored += counts["achievements"]
+        if counts["skipped"]:
+            logger.warning(f"Skipped {counts['skipped']} achievements of unknown apps")
@@ -0,0 +1,106 @@
+"""Weighted fair scheduling of the crawl's work between lanes"""
+
+from collections import deque
+from collections.abc import Iterable
+
+import httpx
+
+from steam2sqlite import ACHIEVEMENT_URL, APPID_URL
+
+# share of the requests each lane gets while it has work
+LANE_WEIGHTS = {"new": 3, "refresh": 4, "retry": 1, "achievements": 2}
+
+# host each lane's requests are made to
+LANE_HOSTS = {
+    "new": httpx.URL(APPID_URL).host,
+    "refresh": httpx.URL(APPID_URL).host,
+    "retry": httpx.URL(APPID_URL).host,
+    "achievements": httpx.URL(ACHIEVEMENT_URL).host,
+}
+
+
+class Lanes:
+    """Smooth weighted round robin over queues of appids
+
+    On every pick each lane with work earns its weight in credit, the lane with the
+    most credit is picked and pays back the total weight. Lanes get picks in
+    proportion to their weights, interleaved rather than in runs, and lanes without
+    work don't hold back the others.
+    """
+
+    def __init__(
+        self,
+        queues: dict[str, Iterable[int]],
+        weights: dict[str, int] = LANE_WEIGHTS,
+        hosts: dict[str, str] = LANE_HOSTS,
+    ) -> None:
+        self.queues = {lane: deque(items) for lane, items in queues.items()}
+        self.weights = {lane: weights.get(lane, 0) for lane in self.queues}
+        self.hosts = {lane: hosts[lane] for lane in self.queues}
+        self.credit = dict.fromkeys(self.queues, 0)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> tuple[str, int]:
+        active = [
+            lane
+            for lane, queue in self.queues.items()
+            if queue and self.weights[lane] > 0
+        ]
+        if not active:
+            raise StopIteration
+
+        for lane in active:
+            self.credit[lane] += self.weights[lane]
+        lane = max(active, key=self.credit.__getitem__)
+        self.credit[lane] -= sum(self.weights[lane] for lane in active)
+        return lane, self.queues[lane].popleft()
+
+    def depths(self) -> dict[str, int]:
+        return {lane: len(queue) for lane, queue in self.queues.items()}
+
+    def etas(self, rates: dict[str, float]) -> dict[str, float | None]:
+        """Seconds until each lane is drained at the `rates` of the hosts
+
+        Lanes of a host share its rate (requests per second) by weight, and a drained
+        lane's share goes to the lanes of the host still with work. Lanes with a
+        weight of 0 never drain (None).
+        """
+        remaining = {lane: float(depth) for lane, depth in self.depths().items()}
+        etas: dict[str, float | None] = {
+            lane: 0.0 if not depth else None for lane, depth in remaining.items()
+        }
+        for host, rate in rates.items():
+            active = [
+                lane
+                for lane in remaining
+                if self.hosts[lane] == host and remaining[lane] and self.weights[lane]
+            ]
+            elapsed = 0.0
+            while active:
+                total = sum(self.weights[lane] for lane in active)
+                drained = min(
+                    active, key=lambda lane: remaining[lane] / self.weights[lane]
+                )
+                duration = remaining[drained] * total / (rate * self.weights[drained])
+                for lane in active:
+                    remaining[lane] -= rate * self.weights[lane] / total * duration
+                elapsed += duration
+                etas[drained] = elapsed
+                active.remove(drained)
+        return etas
+
+    def report(self, rates: dict[str, float]) -> str:
+        """Queue depth and time to drain of each lane"""
+        etas = self.etas(rates)
+        parts = []
+        for lane, depth in self.depths().items():
+            eta = etas[lane]
+            if not depth:
+                parts.append(f"{lane}: 0 queued")
+            elif eta is None:
+                parts.append(f"{lane}: {depth} queued, paused")
+            else:
+                parts.append(f"{lane}: {depth} queued, ~{eta / 3600:.1f}h")
+        return ", ".join(parts)
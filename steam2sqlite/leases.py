@@ -0,0 +1,112 @@
+"""Leases on appids, so crawler processes can share a database
+
+Each process claims the appids of a batch before requesting them, renews the leases
+when the responses are in and releases them once the apps are stored. Leases expire
+after LEASE_DURATION, so the appids of a crashed process are claimed again by the
+others.
+"""
+
+import os
+import socket
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, create_engine, delete, select
+
+from steam2sqlite.models import AppidLease
+
+# longer than a batch can take with all of the navigator's retries
+LEASE_DURATION = timedelta(minutes=10)
+
+# seconds to wait for another process's write transaction
+BUSY_TIMEOUT = 30
+
+
+def new_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def shared_engine(url: str):
+    """Engine for a database written by several processes
+
+    The database is put in WAL mode so readers don't block the writer, and
+    transactions take the write lock when they begin (BEGIN IMMEDIATE) instead of
+    failing to upgrade a read transaction another process has written past.
+    """
+    engine = create_engine(url, echo=False, connect_args={"timeout": BUSY_TIMEOUT})
+
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        # let the begin event start the transactions
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode = WAL")
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def claim(
+    session: Session,
+    owner: str,
+    appids: Sequence[int],
+    now: datetime | None = None,
+    duration: timedelta = LEASE_DURATION,
+) -> list[int]:
+    """Lease the appids that no other owner holds, returns the ones owner holds
+
+    Leases owner already holds are extended, expired ones are taken over.
+    """
+    if not appids:
+        return []
+    now = now or datetime.utcnow()
+    statement = insert(AppidLease)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["appid"],
+            set_={
+                "owner": statement.excluded.owner,
+                "expires": statement.excluded.expires,
+            },
+            where=(AppidLease.owner == owner) | (AppidLease.expires <= now),
+        ),
+        [
+            {"appid": appid, "owner": owner, "expires": now + duration}
+            for appid in appids
+        ],
+    )
+    held = set(
+        session.exec(
+            select(AppidLease.appid)
+            .where(AppidLease.owner == owner)
+            .where(AppidLease.appid.in_(appids))  # type: ignore
+        ).all()
+    )
+    session.commit()
+    return [appid for appid in appids if appid in held]
+
+
+def renew(
+    session: Session,
+    owner: str,
+    appids: Sequence[int],
+    now: datetime | None = None,
+) -> list[int]:
+    """Extend owner's leases, returns the appids owner still holds"""
+    return claim(session, owner, appids, now)
+
+
+def release(session: Session, owner: str, appids: Sequence[int]):
+    if not appids:
+        return
+    session.execute(
+        delete(AppidLease)
+        .where(AppidLease.owner == owner)
+        .where(AppidLease.appid.in_(appids))  # type: ignore
+    )
+    session.commit()
@@ -6,23 +6,49 @@ import json
 import os
 import time
 from argparse import ArgumentParser
+from collections import Counter
 from collections.abc import Sequence
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
 
 import httpx
 import uvloop
 from dotenv import load_dotenv
 from loguru import logger
-from sqlmodel import Session, create_engine
+from sqlmodel import Session, create_engine, select
 
-from steam2sqlite import APPIDS_URL, BATCH_SIZE, navigator, utils
+from steam2sqlite import (
+    APPIDS_URL,
+    BATCH_SIZE,
+    RATE_LIMITS,
+    importer,
+    leases,
+    navigator,
+    profiling,
+    schedule,
+    tracing,
+    utils,
+)
 from steam2sqlite.handler import (
+    get_achievements_due_appids,
     get_appids_from_db,
     get_apps_achievements,
-    get_apps_data,
+    get_apps_data_and_achievements,
     get_error_appids,
+    get_retry_appids,
+    resolve_aliases,
     store_apps_achievements,
     store_apps_data,
 )
+from steam2sqlite.lanes import LANE_WEIGHTS, Lanes
+from steam2sqlite.models import (
+    AppidAlias,
+    AppidError,
+    RunStats,
+    SteamApp,
+    create_db_and_tables,
+)
 
 load_dotenv()
 
@@ -51,6 +77,274 @@ async def get_appids_from_steam(local_file: str | None = None) -> dict[int, str]
     return {item["appid"]: item["name"] for item in appid_data["applist"]["apps"]}
 
 
+def record_run_stats(engine, run_stats: RunStats, request_counts: Counter[str]):
+    run_stats.ended = datetime.datetime.utcnow()
+    run_stats.requests = request_counts["requests"]
+    run_stats.retries = request_counts["retries"]
+    duration = (run_stats.ended - run_stats.started).total_seconds()
+    if duration > 0:
+        run_stats.requests_per_second = run_stats.requests / duration
+
+    logger.info(
+        f"Stored {run_stats.apps_stored} apps ({run_stats.apps_errored} errors) "
+        f"with {run_stats.requests} requests, {run_stats.requests_per_second or 0:.2f} req/s"
+    )
+
+    with Session(engine) as session:
+        session.add(run_stats)
+        session.commit()
+
+
+def store_achievements(
+    session: Session,
+    run_stats: RunStats,
+    apps_achievements_data: list[tuple[SteamApp, list[dict]]],
+):
+    store_apps_achievements(session, apps_achievements_data)
+    run_stats.achievements_stored += sum(
+        len(achievements) for _, achievements in apps_achievements_data
+    )
+
+
+def plan_lanes(
+    session: Session,
+    steam_appids_names: dict[int, str],
+    now: datetime.datetime,
+    weights: dict[str, int] = LANE_WEIGHTS,
+) -> Lanes:
+    """Queue the appids to process in their lanes
+
+    new: appids that aren't in the db yet
+    refresh: apps that are due for a refresh, soonest first
+    retry: appids that errored and are due to be retried
+    achievements: apps with achievements due but not the rest of their details
+    """
+    # query db for all appids we already have, sorted by when they're due
+    db_appids_due = get_appids_from_db(session)
+    db_appids = {appid for appid, _ in db_appids_due}
+    error_appids = set(get_error_appids(session))
+
+    # skip the appids that are not in steam anymore (apps that get removed?)
+    new = [
+        appid
+        for appid in steam_appids_names
+        if appid not in db_appids and appid not in error_appids
+    ]
+    refresh = [
+        appid
+        for appid, due in db_appids_due
+        if (due is None or due <= now)
+        and appid in steam_appids_names
+        and appid not in error_appids
+    ]
+    retry = [
+        appid for appid in get_retry_appids(session, now) if appid in steam_appids_names
+    ]
+    # refreshed apps get their achievements along with the next batch
+    refreshing = set(refresh) | set(retry)
+    achievements = [
+        appid
+        for appid in get_achievements_due_appids(session, now)
+        if appid in steam_appids_names and appid not in refreshing
+    ]
+
+    return Lanes(
+        {
+            "new": new,
+            "refresh": refresh,
+            "retry": retry,
+            "achievements": achievements,
+        },
+        weights,
+    )
+
+
+def still_due(
+    session: Session, picks: list[tuple[str, int]], now: datetime.datetime
+) -> list[tuple[str, int]]:
+    """The picks that are still due in their lane
+
+    Crawlers sharing the database may have processed them since the lanes were
+    planned.
+    """
+    appids = [appid for _, appid in picks]
+    apps = {
+        app.appid: app
+        for app in session.exec(
+            select(SteamApp).where(SteamApp.appid.in_(appids))  # type: ignore
+        )
+    }
+    errors = dict(
+        session.exec(
+            select(AppidError.appid, AppidError.updated).where(
+                AppidError.appid.in_(appids)  # type: ignore
+            )
+        ).all()
+    )
+    aliases = set(
+        session.exec(
+            select(AppidAlias.appid).where(AppidAlias.appid.in_(appids))  # type: ignore
+        ).all()
+    )
+    retry_before = now - datetime.timedelta(days=schedule.ERROR_RETRY_INTERVAL)
+
+    def due(lane: str, appid: int) -> bool:
+        app = apps.get(appid)
+        if lane == "new":
+            return app is None and appid not in errors and appid not in aliases
+        if lane == "refresh":
+            return (
+                app is not None
+                and (app.refresh_due is None or app.refresh_due <= now)
+                and appid not in errors
+            )
+        if lane == "retry":
+            return appid in errors and (
+                errors[appid] is None or errors[appid] <= retry_before
+            )
+        return (
+            app is not None
+            and app.achievements_total > 0
+            and (app.achievements_due is None or app.achievements_due <= now)
+        )
+
+    return [(lane, appid) for lane, appid in picks if due(lane, appid)]
+
+
+def count_errors(session: Session, appids: list[int], since: datetime.datetime) -> int:
+    """Appids with an error recorded since `since`
+
+    Appids recorded as aliases, or left out because their lease was lost, aren't
+    errors.
+    """
+    if not appids:
+        return 0
+    return len(
+        session.exec(
+            select(AppidError.appid).where(
+                AppidError.appid.in_(appids),  # type: ignore
+                AppidError.updated >= since,
+            )
+        ).all()
+    )
+
+
+def claim_picks(session: Session, lanes: Lanes, owner: str) -> list[tuple[str, int]]:
+    """The next BATCH_SIZE picks leased to owner
+
+    Picks that other crawlers hold or have processed already are skipped.
+    """
+    batch: list[tuple[str, int]] = []
+    while len(batch) < BATCH_SIZE and (
+        picks := list(islice(lanes, BATCH_SIZE - len(batch)))
+    ):
+        claimed = set(leases.claim(session, owner, [appid for _, appid in picks]))
+        due = still_due(
+            session,
+            [pick for pick in picks if pick[1] in claimed],
+            datetime.datetime.utcnow(),
+        )
+        leases.release(session, owner, list(claimed - {appid for _, appid in due}))
+        batch += due
+    return batch
+
+
+def crawl(
+    engine,
+    steam_appids_names: dict[int, str],
+    run_stats: RunStats,
+    start_time: float,
+    limit: float | None,
+    lane_weights: dict[str, int] = LANE_WEIGHTS,
+    lease_owner: str | None = None,
+):
+    # objects stay loaded across commits, so reading them while the requests are
+    # made doesn't start a transaction
+    with Session(engine, expire_on_commit=False) as session:
+        # aliases cost no requests, the apps they resolve to are crawled instead
+        steam_appids_names = resolve_aliases(session, steam_appids_names)
+        lanes = plan_lanes(
+            session, steam_appids_names, datetime.datetime.utcnow(), lane_weights
+        )
+        # every pick is a request to the store, or to the Web API for achievements
+        rates = {host: rate for host, (rate, _) in RATE_LIMITS.items()}
+        logger.info(f"Lanes: {lanes.report(rates)}")
+
+        logger.info("Loading app data from Steam API and saving to db")
+
+        # the achievements of each batch are requested along with the next batch
+        apps_with_achievements: list[SteamApp] = []
+        while picks := (
+            claim_picks(session, lanes, lease_owner)
+            if lease_owner
+            else list(islice(lanes, BATCH_SIZE))
+        ):
+            appids = [appid for lane, appid in picks if lane != "achievements"]
+            apps_with_achievements += [
+                session.get(SteamApp, appid)
+                for lane, appid in picks
+                if lane == "achievements"
+            ]
+            # no transaction (or with leases, write lock) is held over the requests
+            session.commit()
+            batch_start = datetime.datetime.utcnow()
+
+            apps_data, apps_achievements_data = get_apps_data_and_achievements(
+                session, steam_appids_names, appids, apps_with_achievements
+            )
+            if lease_owner:
+                leased = [appid for _, appid in picks] + [
+                    app.appid for app in apps_with_achievements
+                ]
+                held = set(leases.renew(session, lease_owner, leased))
+                if lost := set(leased) - held:
+                    logger.warning(f"Lost the leases of {len(lost)} appids")
+                    apps_data = [
+                        app_data
+                        for app_data in apps_data
+                        if int(next(iter(app_data))) in held
+                    ]
+                    apps_achievements_data = [
+                        (app, achievements)
+                        for app, achievements in apps_achievements_data
+                        if app.appid in held
+                    ]
+            store_achievements(session, run_stats, apps_achievements_data)
+            apps = store_apps_data(session, steam_appids_names, apps_data)
+
+            run_stats.apps_fetched += len(apps_data)
+            run_stats.apps_stored += len(apps)
+            run_stats.apps_errored += count_errors(session, appids, batch_start)
+
+            now = datetime.datetime.utcnow()
+            apps_with_achievements = [
+                app for app in apps if schedule.achievements_due(app, now)
+            ]
+            if lease_owner:
+                # apps keep their leases until their achievements are stored
+                leases.release(
+                    session,
+                    lease_owner,
+                    list(set(leased) - {app.appid for app in apps_with_achievements}),
+                )
+
+            if limit and (time.monotonic() - start_time) / 60 > limit:
+                logger.info(f"Limit ({limit} min) reached shutting down...")
+                break
+
+        if apps_with_achievements:
+            session.commit()
+            store_achievements(
+                session, run_stats, get_apps_achievements(apps_with_achievements)
+            )
+            if lease_owner:
+                leases.release(
+                    session, lease_owner, [app.appid for app in apps_with_achievements]
+                )
+
+        logger.info(f"Lanes left: {lanes.report(rates)}")
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     parser = ArgumentParser()
     parser.add_argument(
@@ -62,64 +356,124 @@ def main(argv: Sequence[str] | None = None) -> int:
         const=1,
         help="limit runtime (minutes)",
     )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        nargs="?",
+        const="profile",
+        help="profile the crawl stages and write the stats to this directory",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        help="number of functions per stage in the profile summary",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        nargs="?",
+        const="trace.jsonl",
+        help="write the timings of every request and database write to this "
+        "JSONL file, see scripts/trace_report.py",
+    )
+    parser.add_argument(
+        "--shard",
+        type=utils.parse_shard,
+        default=None,
+        help="only process appids in shard i of N (formatted i/N), "
+        "storing them in their own database file",
+    )
+    parser.add_argument(
+        "--lane-weight",
+        type=utils.parse_lane_weight,
+        action="append",
+        default=[],
+        help="share of the requests for a lane while it has work, formatted "
+        f"LANE=WEIGHT (default: {','.join(f'{k}={v}' for k, v in LANE_WEIGHTS.items())})",
+    )
+    parser.add_argument(
+        "--lease",
+        action="store_true",
+        help="share the database with other crawler processes, each claiming the "
+        "appids it processes",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_sources",
+        type=Path,
+        nargs="+",
+        default=None,
+        metavar="SOURCE",
+        help="import archived responses instead of crawling, from directories of "
+        "<appid>.json and <appid>_achievements.json files or JSONL files",
+    )
     args = parser.parse_args(argv)
 
+    for source in args.import_sources or []:
+        if not source.exists():
+            logger.error(f"{source} doesn't exist")
+            return 2
+
     logger.info("Starting...")
 
     start_time = time.monotonic()
+    run_stats = RunStats(started=datetime.datetime.utcnow())
+    request_counts = navigator.request_counts.copy()
 
     uvloop.install()
 
-    engine = create_engine(SQLITE_URL, echo=False)
+    if args.shard:
+        shard_file = utils.shard_file_name(sqlite_file_name, args.shard)
+        logger.info(
+            f"Processing shard {args.shard[0]}/{args.shard[1]} into {shard_file}"
+        )
+        url = f"sqlite:///{shard_file}"
+    else:
+        url = SQLITE_URL
+    if args.lease:
+        engine = leases.shared_engine(url)
+        lease_owner = leases.new_owner()
+        logger.info(f"Claiming appids as {lease_owner}")
+    else:
+        engine = create_engine(url, echo=False)
+        lease_owner = None
+    if args.shard or args.import_sources:
+        create_db_and_tables(engine)
+
+    if args.import_sources:
+        with Session(engine) as session:
+            importer.import_sources(session, args.import_sources, run_stats)
+        record_run_stats(engine, run_stats, Counter())
+        return 0
 
     # From steam api, dict of: {appids: names}
     steam_appids_names = asyncio.run(get_appids_from_steam(APPIDS_FILE))
-
-    with Session(engine) as session:
-        # query db for all appids we already have, sort by last_modified
-        db_appids_updated = get_appids_from_db(session)
-
-        # identify any missing appids -- these go on the top of our stack to process
-        missing_appids = set(steam_appids_names.keys()) - {
-            appid for appid, _ in db_appids_updated
+    if args.shard:
+        steam_appids_names = {
+            appid: name
+            for appid, name in steam_appids_names.items()
+            if utils.in_shard(appid, args.shard)
         }
 
-        # remove any appids that have been modified recently
-        db_appids = [
-            appid
-            for appid, updated in db_appids_updated
-            if ((datetime.datetime.utcnow().date() - updated.date()).days > 3)
-        ]
-
-        appids_missing_and_older = list(missing_appids) + db_appids
-
-        # remove any appids that have been flagged as errors from previous runs
-        error_appids_set = set(get_error_appids(session))
-        appids_without_errors = [
-            appid for appid in appids_missing_and_older if appid not in error_appids_set
-        ]
-
-        # remove any appids that are not in steam anymore (apps that get removed?)
-        appids_to_process = [
-            appid for appid in appids_without_errors if appid in steam_appids_names
-        ]
-
-        logger.info("Loading app data from Steam API and saving to db")
-
-        for appids in utils.grouper(appids_to_process, BATCH_SIZE, fillvalue=None):
-            apps_data = get_apps_data(session, steam_appids_names, appids)
-            apps = store_apps_data(session, steam_appids_names, apps_data)
+    profiler = profiling.profile_crawl() if args.profile else None
+    try:
+        with tracing.trace_crawl(args.trace) if args.trace else nullcontext():
+            crawl(
+                engine,
+                steam_appids_names,
+                run_stats,
+                start_time,
+                args.limit,
+                LANE_WEIGHTS | dict(args.lane_weight),
+                lease_owner,
+            )
+    finally:
+        if profiler:
+            profiler.unpatch()
+            profiler.dump(args.profile, args.profile_top)
 
-            apps_with_achievements = [app for app in apps if app.achievements_total > 0]
-            if apps_with_achievements:
-                apps_achievements_data = utils.delay_by(len(apps_with_achievements))(
-                    get_apps_achievements
-                )(apps_with_achievements)
-                store_apps_achievements(session, apps_achievements_data)
-
-            if args.limit and (time.monotonic() - start_time) / 60 > args.limit:
-                logger.info(f"Limit ({args.limit} min) reached shutting down...")
-                break
+        record_run_stats(engine, run_stats, navigator.request_counts - request_counts)
 
     return 0
 
@@ -1,17 +1,41 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Optional  # to be removed once Pydantic supports Union operator
 from typing import List
 
+from sqlalchemy import DDL, Column, Integer, event
+from sqlalchemy.types import TypeDecorator
 from sqlmodel import Field, Relationship, SQLModel
 
+EPOCH = datetime(1970, 1, 1)
+
+
+class EpochMicroseconds(TypeDecorator):
+    """Naive UTC datetime stored as integer microseconds since the epoch"""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return (value - EPOCH) // timedelta(microseconds=1)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return EPOCH + timedelta(microseconds=value)
+
 
 class CategorySteamAppLink(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # appid first so an app's categories are a range of the primary key
+    appid: Optional[int] = Field(
+        default=None, foreign_key="steam_app.appid", primary_key=True
+    )
     category_pk: Optional[int] = Field(
         default=None, foreign_key="category.pk", primary_key=True
     )
-    steam_app_pk: Optional[int] = Field(
-        default=None, foreign_key="steam_app.pk", primary_key=True
-    )
 
 
 class Category(SQLModel, table=True):
@@ -24,12 +48,14 @@ class Category(SQLModel, table=True):
 
 
 class GenreSteammAppLink(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    appid: Optional[int] = Field(
+        default=None, foreign_key="steam_app.appid", primary_key=True
+    )
     genre_pk: Optional[int] = Field(
         default=None, foreign_key="genre.pk", primary_key=True
     )
-    steam_app_pk: Optional[int] = Field(
-        default=None, foreign_key="steam_app.pk", primary_key=True
-    )
 
 
 class Genre(SQLModel, table=True):
@@ -43,8 +69,7 @@ class Genre(SQLModel, table=True):
 
 class SteamApp(SQLModel, table=True):
     __tablename__ = "steam_app"  # type: ignore
-    pk: Optional[int] = Field(default=None, primary_key=True)
-    appid: int = Field(index=True, sa_column_kwargs={"unique": True})
+    appid: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
     type: Optional[str] = Field(default=None)
     is_free: Optional[bool] = Field(default=False)
     name: str = Field(index=True)
@@ -57,9 +82,28 @@ class SteamApp(SQLModel, table=True):
     initial_price: Optional[int] = Field(default=None)
     current_price: Optional[int] = Field(default=None)
 
-    created: datetime = Field(sa_column_kwargs={"default": datetime.utcnow})
+    # when to fetch the app again and the days between fetches (see schedule.py)
+    refresh_due: Optional[datetime] = Field(
+        default=None, sa_column=Column(EpochMicroseconds, nullable=True)
+    )
+    refresh_interval: Optional[float] = Field(default=None)
+
+    # achievements are refreshed on their own schedule (see schedule.py)
+    achievements_due: Optional[datetime] = Field(
+        default=None, sa_column=Column(EpochMicroseconds, nullable=True)
+    )
+    achievements_interval: Optional[float] = Field(default=None)
+
+    created: datetime = Field(
+        sa_column=Column(EpochMicroseconds, nullable=False, default=datetime.utcnow)
+    )
     updated: datetime = Field(
-        sa_column_kwargs={"default": datetime.utcnow, "onupdate": datetime.utcnow}
+        sa_column=Column(
+            EpochMicroseconds,
+            nullable=False,
+            default=datetime.utcnow,
+            onupdate=datetime.utcnow,
+        )
     )
 
     categories: List[Category] = Relationship(
@@ -79,12 +123,64 @@ class Achievement(SQLModel, table=True):
     name: str = Field()
     percent: float = Field()
 
-    steam_app_pk: Optional[int] = Field(default=None, foreign_key="steam_app.pk")
+    appid: Optional[int] = Field(
+        default=None, foreign_key="steam_app.appid", index=True
+    )
     steam_app: Optional[SteamApp] = Relationship(back_populates="achievements")
 
 
+class AchievementStats(SQLModel, table=True):
+    """Summary of each app's achievement percentages (see achievement_stats.py)"""
+
+    __tablename__ = "achievement_stats"  # type: ignore
+
+    appid: int = Field(
+        primary_key=True,
+        foreign_key="steam_app.appid",
+        sa_column_kwargs={"autoincrement": False},
+    )
+    achievements: int = Field()
+    min_percent: float = Field()
+    median_percent: float = Field()
+    mean_percent: float = Field()
+    max_percent: float = Field()
+    rare_achievements: int = Field()
+    rarest_achievement: str = Field()
+    difficulty: float = Field(index=True)
+
+
+class AppSummary(SQLModel, table=True):
+    """Each app with its genres, categories and achievement statistics in one row,
+    for single table reads (see app_summary.py)"""
+
+    __tablename__ = "app_summary"  # type: ignore
+
+    appid: int = Field(
+        primary_key=True,
+        foreign_key="steam_app.appid",
+        sa_column_kwargs={"autoincrement": False},
+    )
+    name: str = Field()
+    type: Optional[str] = Field(default=None)
+    is_free: Optional[bool] = Field(default=None)
+    controller_support: Optional[str] = Field(default=None)
+    metacritic_score: Optional[int] = Field(default=None)
+    recommendations: Optional[int] = Field(default=None)
+    release_date: Optional[date] = Field(default=None)
+    initial_price: Optional[int] = Field(default=None)
+    current_price: Optional[int] = Field(default=None)
+    # JSON arrays of the descriptions
+    genres: str = Field(default="[]")
+    categories: str = Field(default="[]")
+    achievements: int = Field(default=0)
+    median_percent: Optional[float] = Field(default=None)
+    rare_achievements: Optional[int] = Field(default=None)
+    difficulty: Optional[float] = Field(default=None)
+    updated: datetime = Field(sa_column=Column(EpochMicroseconds, nullable=False))
+
+
 class AppidError(SQLModel, table=True):
-    """Table to store appids to skip"""
+    """Table to store appids to skip until they're retried"""
 
     __tablename__ = "appid_error"  # type: ignore
 
@@ -92,6 +188,207 @@ class AppidError(SQLModel, table=True):
     appid: int = Field(sa_column_kwargs={"unique": True})
     name: Optional[str] = Field(default=None)
     reason: Optional[str] = Field(default=None)
+    # when the error was last seen, errors are retried on a schedule (see schedule.py)
+    updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(EpochMicroseconds, nullable=True, default=datetime.utcnow),
+    )
+
+
+class AppidAlias(SQLModel, table=True):
+    """appids whose details are those of another app (bundles, renamed apps, ...)"""
+
+    __tablename__ = "appid_alias"  # type: ignore
+
+    appid: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    target_appid: int = Field(index=True)
+    name: Optional[str] = Field(default=None)
+    updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(EpochMicroseconds, nullable=True, default=datetime.utcnow),
+    )
+
+
+class Tombstone(SQLModel, table=True):
+    """Rows deleted from the TOMBSTONE_TABLES (by their triggers), for changesets"""
+
+    __tablename__ = "tombstone"  # type: ignore
+
+    table_name: str = Field(primary_key=True)
+    appid: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    # at least the deleted row's `updated`, so a copy of the row is never newer
+    deleted: datetime = Field(
+        sa_column=Column(EpochMicroseconds, nullable=False, index=True)
+    )
+
+
+class AppidLease(SQLModel, table=True):
+    """appids claimed by a crawler process, see leases.py"""
+
+    __tablename__ = "appid_lease"  # type: ignore
+
+    appid: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    owner: str = Field()
+    expires: datetime = Field(sa_column=Column(EpochMicroseconds, nullable=False))
+
+
+class RunStats(SQLModel, table=True):
+    """Throughput of each run of the crawler"""
+
+    __tablename__ = "run_stats"  # type: ignore
+
+    pk: Optional[int] = Field(default=None, primary_key=True)
+    started: datetime = Field()
+    ended: Optional[datetime] = Field(default=None)
+    apps_fetched: int = Field(default=0)
+    apps_stored: int = Field(default=0)
+    apps_errored: int = Field(default=0)
+    achievements_stored: int = Field(default=0)
+    requests: int = Field(default=0)
+    retries: int = Field(default=0)
+    requests_per_second: Optional[float] = Field(default=None)
+
+
+class AppYearCount(SQLModel, table=True):
+    """Apps per release year, type and controller support (kept up to date by triggers)"""
+
+    __tablename__ = "app_year_count"  # type: ignore
+
+    pk: Optional[int] = Field(default=None, primary_key=True)
+    year: Optional[int] = Field(default=None)
+    type: Optional[str] = Field(default=None)
+    controller_support: Optional[str] = Field(default=None)
+    apps: int = Field(default=0)
+
+
+class GenreAppCount(SQLModel, table=True):
+    """Apps per genre (kept up to date by triggers)"""
+
+    __tablename__ = "genre_app_count"  # type: ignore
+
+    genre_pk: int = Field(foreign_key="genre.pk", primary_key=True)
+    apps: int = Field(default=0)
+
+
+class CategoryAppCount(SQLModel, table=True):
+    """Apps per category (kept up to date by triggers)"""
+
+    __tablename__ = "category_app_count"  # type: ignore
+
+    category_pk: int = Field(foreign_key="category.pk", primary_key=True)
+    apps: int = Field(default=0)
+
+
+def _year_count_sql(row: str, change: str) -> str:
+    """Statements adding `change` to the app_year_count of `row` (NEW or OLD)"""
+    year = f"CAST(substr({row}.release_date, 1, 4) AS INTEGER)"
+    match = (
+        f"year IS {year} AND type IS {row}.type "
+        f"AND controller_support IS {row}.controller_support"
+    )
+    return f"""
+        INSERT INTO app_year_count (year, type, controller_support, apps)
+        SELECT {year}, {row}.type, {row}.controller_support, 0
+        WHERE NOT EXISTS (SELECT 1 FROM app_year_count WHERE {match});
+        UPDATE app_year_count SET apps = apps {change} WHERE {match};
+        DELETE FROM app_year_count WHERE apps <= 0;"""
+
+
+def _link_count_sql(table: str, link_table: str) -> list[str]:
+    """Triggers counting the apps linked to each row of `table`"""
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_insert
+        AFTER INSERT ON {link_table}
+        BEGIN
+            INSERT INTO {table}_app_count ({table}_pk, apps) VALUES (NEW.{table}_pk, 1)
+            ON CONFLICT ({table}_pk) DO UPDATE SET apps = apps + 1;
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_app_count_delete
+        AFTER DELETE ON {link_table}
+        BEGIN
+            UPDATE {table}_app_count SET apps = apps - 1 WHERE {table}_pk = OLD.{table}_pk;
+        END""",
+    ]
+
+
+# keep the *_count tables up to date as apps are stored
+COUNT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_insert
+    AFTER INSERT ON steam_app
+    BEGIN{_year_count_sql("NEW", "+ 1")}
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_update
+    AFTER UPDATE OF release_date, type, controller_support ON steam_app
+    BEGIN{_year_count_sql("OLD", "- 1")}{_year_count_sql("NEW", "+ 1")}
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS steam_app_year_count_delete
+    AFTER DELETE ON steam_app
+    BEGIN{_year_count_sql("OLD", "- 1")}
+    END""",
+    *_link_count_sql("genre", "genresteammapplink"),
+    *_link_count_sql("category", "categorysteamapplink"),
+]
+
+for trigger in COUNT_TRIGGERS:
+    event.listen(SQLModel.metadata, "after_create", DDL(trigger))
+
+
+# tables whose deleted rows are recorded in tombstone
+TOMBSTONE_TABLES = ["steam_app", "appid_error", "appid_alias"]
+
+# the current time in microseconds since the epoch (julianday has milliseconds)
+_NOW_MICROSECONDS = "CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER)"
+
+TOMBSTONE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_tombstone AFTER DELETE ON {table}
+    BEGIN
+        INSERT OR REPLACE INTO tombstone (table_name, appid, deleted)
+        VALUES ('{table}', OLD.appid, max({_NOW_MICROSECONDS}, ifnull(OLD.updated, 0)));
+    END"""
+    for table in TOMBSTONE_TABLES
+]
+
+for trigger in TOMBSTONE_TRIGGERS:
+    event.listen(SQLModel.metadata, "after_create", DDL(trigger))
+
+
+# full-text index over the app names, used by Datasette's search box
+FTS_TABLE = "steam_app_fts"
+
+FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, content='steam_app', content_rowid='appid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON steam_app
+    BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name) VALUES (NEW.appid, NEW.name);
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON steam_app
+    BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name)
+        VALUES ('delete', OLD.appid, OLD.name);
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name ON steam_app
+    BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name)
+        VALUES ('delete', OLD.appid, OLD.name);
+        INSERT INTO {FTS_TABLE} (rowid, name) VALUES (NEW.appid, NEW.name);
+    END""",
+]
+
+for sql in FTS_SQL:
+    event.listen(SQLModel.metadata, "after_create", DDL(sql))
 
 
 def create_db_and_tables(engine):
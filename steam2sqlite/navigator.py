@@ -1,9 +1,13 @@
 import asyncio
 import ssl
+import time
+from collections import Counter
 
 import httpx
 from loguru import logger
 
+from steam2sqlite import RATE_LIMITS
+
 
 class NavigatorError(Exception):
     """Exception for navigator errors (after multiple retries)"""
@@ -12,31 +16,98 @@ class NavigatorError(Exception):
         self.url = url
 
 
+class TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `capacity`
+
+    Each request reserves the next token and sleeps until it's due, which keeps no
+    asyncio state so a bucket can be shared by every event loop of a run.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """Take a token, returns the seconds to wait until it may be used"""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0)
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# one bucket per rate limited host
+buckets = {
+    host: TokenBucket(rate, capacity) for host, (rate, capacity) in RATE_LIMITS.items()
+}
+
+# running totals of "requests" and "retries" made by get
+request_counts: Counter[str] = Counter()
+
+# tracing.Tracer of the run, gets the timings of every request made by get
+tracer = None
+
+
+async def throttle(url: str) -> None:
+    """Wait for the rate limit of the url's host, if it has one"""
+    bucket = buckets.get(httpx.URL(url).host)
+    if bucket is not None:
+        await bucket.acquire()
+
+
 async def get(
     client: httpx.AsyncClient,
     url: str,
     wait_time: float = 2,
     headers: dict[str, str] | None = None,
 ) -> httpx.Response:
+    throttled = time.perf_counter()
+    await throttle(url)
+    request_counts["requests"] += 1
+    trace = tracer.request(url, time.perf_counter() - throttled) if tracer else None
     try:
-        resp = (await client.get(url, headers=headers)).raise_for_status()
+        resp = await client.get(
+            url, headers=headers, extensions=trace.extensions if trace else None
+        )
+        if trace:
+            trace.finish(resp)
+        resp.raise_for_status()
     except (httpx.HTTPError, ssl.SSLError) as e:
+        if trace and not trace.finished:
+            trace.finish(error=e)
         if wait_time > 2**6:
             logger.exception(f"Response never succeeded on url {url}")
+            if tracer:
+                tracer.request_done(url)
             raise NavigatorError(url=url) from e
         logger.error(f"Error in response, trying again in: {wait_time}s")
+        request_counts["retries"] += 1
         await asyncio.sleep(wait_time)
         return await get(client, url, wait_time=wait_time * 2, headers=headers)
 
+    if tracer:
+        tracer.request_done(url)
     return resp
 
 
-async def make_requests(urls: list[str]) -> list[httpx.Response]:
-    """List of urls to a list of responses using asyncio"""
+def new_client() -> httpx.AsyncClient:
     limits = httpx.Limits(max_connections=10, max_keepalive_connections=5)
-    async with httpx.AsyncClient(
+    return httpx.AsyncClient(
         headers={"accept": "application/json"}, timeout=10, limits=limits
-    ) as client:
+    )
+
+
+async def make_requests(urls: list[str]) -> list[httpx.Response]:
+    """List of urls to a list of responses using asyncio"""
+    async with new_client() as client:
         tasks = [get(client, url) for url in urls]
         responses = await asyncio.gather(*tasks, return_exceptions=True)
 
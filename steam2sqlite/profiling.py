@@ -0,0 +1,145 @@
+import cProfile
+import inspect
+import pstats
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from io import StringIO
+from pathlib import Path
+
+import httpx
+from loguru import logger
+
+from steam2sqlite import handler, navigator
+
+# (stage name, owner, attribute) of the hot spots in a crawl
+CRAWL_STAGES = [
+    ("load_app_into_db", handler, "load_app_into_db"),
+    ("attach_achievements_to_app", handler, "attach_achievements_to_app"),
+    ("navigator", navigator, "get"),
+    ("json_decode", httpx.Response, "json"),
+]
+
+
+# stages running in the current task, a stage calling itself (navigator.get retrying
+# a url) is counted once
+_running: ContextVar[frozenset[str]] = ContextVar("running", default=frozenset())
+
+
+class StageProfiler:
+    """Keeps a separate cProfile per stage of the crawl
+
+    Profiles are timed on process (CPU) time so sleeps and network waits are left out.
+    Wall time is recorded next to it for each stage.
+    Nested stages pause the outer stage's profile while they run.
+    """
+
+    def __init__(self):
+        self.profiles: dict[str, cProfile.Profile] = {}
+        self.calls: Counter[str] = Counter()
+        self.wall: defaultdict[str, float] = defaultdict(float)
+        self.cpu: defaultdict[str, float] = defaultdict(float)
+        self._stack: list[str] = []
+        self._patched: list[tuple[object, str, object]] = []
+
+    def _enter(self, stage: str) -> tuple[float, float]:
+        if self._stack:
+            self.profiles[self._stack[-1]].disable()
+        self._stack.append(stage)
+        if stage not in self.profiles:
+            self.profiles[stage] = cProfile.Profile(time.process_time)
+        self.profiles[stage].enable()
+        return time.perf_counter(), time.process_time()
+
+    def _exit(self, stage: str, start: tuple[float, float]):
+        wall_start, cpu_start = start
+        self.wall[stage] += time.perf_counter() - wall_start
+        self.cpu[stage] += time.process_time() - cpu_start
+        self.calls[stage] += 1
+
+        # coroutines can finish out of order, so pop this stage wherever it is
+        top = self._stack[-1]
+        del self._stack[len(self._stack) - 1 - self._stack[::-1].index(stage)]
+        if top == stage:
+            self.profiles[stage].disable()
+            if self._stack:
+                self.profiles[self._stack[-1]].enable()
+
+    def wrap(self, stage: str, func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_inner(*args, **kwargs):
+                running = _running.get()
+                if stage in running:
+                    return await func(*args, **kwargs)
+                token = _running.set(running | {stage})
+                start = self._enter(stage)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._exit(stage, start)
+                    _running.reset(token)
+
+            return async_inner
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            running = _running.get()
+            if stage in running:
+                return func(*args, **kwargs)
+            token = _running.set(running | {stage})
+            start = self._enter(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(stage, start)
+                _running.reset(token)
+
+        return inner
+
+    def patch(self, stage: str, owner: object, attr: str):
+        """Replace owner.attr with a profiled version (undo with unpatch)"""
+        func = getattr(owner, attr)
+        self._patched.append((owner, attr, func))
+        setattr(owner, attr, self.wrap(stage, func))
+
+    def unpatch(self):
+        while self._patched:
+            owner, attr, func = self._patched.pop()
+            setattr(owner, attr, func)
+
+    def stage_table(self) -> str:
+        lines = [f"{'stage':<30}{'calls':>10}{'wall (s)':>12}{'cpu (s)':>12}"]
+        for stage in self.profiles:
+            lines.append(
+                f"{stage:<30}{self.calls[stage]:>10}"
+                f"{self.wall[stage]:>12.3f}{self.cpu[stage]:>12.3f}"
+            )
+        return "\n".join(lines)
+
+    def summary(self, top_n: int = 20) -> str:
+        out = StringIO()
+        out.write(self.stage_table() + "\n")
+        for stage, prof in self.profiles.items():
+            out.write(f"\n== {stage}: top {top_n} by cumulative cpu time ==\n")
+            pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(top_n)
+        return out.getvalue()
+
+    def dump(self, directory: str | Path, top_n: int = 20):
+        """Write <stage>.prof (pstats format) for every stage and a summary.txt"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for stage, prof in self.profiles.items():
+            prof.dump_stats(directory / f"{stage}.prof")
+        (directory / "summary.txt").write_text(self.summary(top_n))
+        logger.info(f"Profile written to {directory}\n{self.stage_table()}")
+
+
+def profile_crawl() -> StageProfiler:
+    """Profiler with all the CRAWL_STAGES patched in"""
+    profiler = StageProfiler()
+    for stage, owner, attr in CRAWL_STAGES:
+        profiler.patch(stage, owner, attr)
+    return profiler
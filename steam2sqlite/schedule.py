@@ -0,0 +1,77 @@
+"""When to refresh apps and their achievements"""
+
+from datetime import date, datetime, timedelta
+
+from steam2sqlite.models import Achievement, SteamApp
+
+# days between refreshes of an app's details, doubled every time nothing changed
+REFRESH_MIN_INTERVAL = 2.0
+REFRESH_MAX_INTERVAL = 60.0
+
+# apps that are coming soon or were released in the last NEW_APP_DAYS days are
+# refreshed at least every NEW_APP_INTERVAL days
+NEW_APP_DAYS = 30
+NEW_APP_INTERVAL = 0.5
+
+# days between achievement refreshes, doubled every time the percentages were stable
+ACHIEVEMENTS_MIN_INTERVAL = 3.0
+ACHIEVEMENTS_MAX_INTERVAL = 90.0
+
+# days before an appid that errored is tried again
+ERROR_RETRY_INTERVAL = 30.0
+
+# percentage points an achievement has to move for the percentages to have changed
+ACHIEVEMENT_PERCENT_CHANGE = 1.0
+
+
+def next_interval(
+    interval: float | None, changed: bool, floor: float, ceiling: float
+) -> float:
+    """Back off while nothing changes, start over from floor when something does"""
+    if changed or interval is None:
+        return floor
+    return min(max(interval * 2, floor), ceiling)
+
+
+def is_new(release_date: date | None, coming_soon: bool, now: datetime) -> bool:
+    return coming_soon or (
+        release_date is not None
+        and (now.date() - release_date) <= timedelta(days=NEW_APP_DAYS)
+    )
+
+
+def reschedule_refresh(app: SteamApp, changed: bool, now: datetime, new: bool = False):
+    interval = next_interval(
+        app.refresh_interval, changed, REFRESH_MIN_INTERVAL, REFRESH_MAX_INTERVAL
+    )
+    if new:
+        interval = min(interval, NEW_APP_INTERVAL)
+    app.refresh_interval = interval
+    app.refresh_due = now + timedelta(days=interval)
+
+
+def achievements_changed(stored: list[Achievement], fetched: list[dict]) -> bool:
+    percents = {achievement.name: achievement.percent for achievement in stored}
+    if percents.keys() != {achievement["name"] for achievement in fetched}:
+        return True
+    return any(
+        abs(percents[achievement["name"]] - float(achievement["percent"]))
+        >= ACHIEVEMENT_PERCENT_CHANGE
+        for achievement in fetched
+    )
+
+
+def achievements_due(app: SteamApp, now: datetime) -> bool:
+    return app.achievements_total > 0 and (
+        app.achievements_due is None or app.achievements_due <= now
+    )
+
+
+def reschedule_achievements(app: SteamApp, changed: bool, now: datetime):
+    app.achievements_interval = next_interval(
+        app.achievements_interval,
+        changed,
+        ACHIEVEMENTS_MIN_INTERVAL,
+        ACHIEVEMENTS_MAX_INTERVAL,
+    )
+    app.achievements_due = now + timedelta(days=app.achievements_interval)
@@ -0,0 +1,114 @@
+"""Stream parsed apps from Steam without a database
+
+    async for result in stream_apps([620, 659]):
+        if isinstance(result, DataParsingError):
+            ...  # appid without app data, see result.reason
+        else:
+            ...  # SteamApp with its genres, categories and achievements
+
+Apps are yielded as their responses arrive, through the navigator's retries and rate
+limits. Only `concurrency` apps are in flight at a time, so appids can be any
+iterable, e.g. a generator over the whole catalog.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator, Iterable
+from contextlib import nullcontext
+from itertools import islice
+
+import httpx
+
+from steam2sqlite import ACHIEVEMENT_URL, BATCH_SIZE, navigator
+from steam2sqlite.appdetails import appdetails_url
+from steam2sqlite.handler import (
+    DataParsingError,
+    build_app,
+    get_app_data,
+    parse_achievements,
+)
+from steam2sqlite.models import Achievement, SteamApp
+
+StreamResult = SteamApp | DataParsingError
+
+# raised by the parsers on responses that aren't shaped like Steam's, e.g. null
+MALFORMED_ERRORS = (AttributeError, IndexError, KeyError, TypeError, ValueError)
+
+
+async def get_json(client: httpx.AsyncClient, appid: int, url: str) -> dict:
+    """The JSON response of url, failures are raised as DataParsingError"""
+    try:
+        return (await navigator.get(client, url)).json()
+    except navigator.NavigatorError as e:
+        raise DataParsingError(appid, reason=f"{e}")
+    except json.JSONDecodeError as e:
+        raise DataParsingError(appid, reason=f"Invalid JSON from {url}: {e}")
+
+
+async def fetch_app(
+    client: httpx.AsyncClient, appid: int, achievements: bool
+) -> list[StreamResult]:
+    """The app of appid, followed by an error if its achievements couldn't be read"""
+    try:
+        data = await get_json(client, appid, appdetails_url(appid))
+        app = build_app(get_app_data(data))
+    except DataParsingError as e:
+        return [e]
+    except MALFORMED_ERRORS as e:
+        return [DataParsingError(appid, reason=f"Malformed app data: {e!r}")]
+
+    if not achievements or app.achievements_total == 0:
+        return [app]
+
+    try:
+        data = await get_json(client, appid, ACHIEVEMENT_URL.format(appid))
+    except DataParsingError as e:
+        return [app, e]
+    try:
+        achievements_data = parse_achievements(data)
+        if achievements_data is None:
+            raise DataParsingError(appid, reason="Response without achievements")
+        app.achievements = [
+            Achievement(**achievement) for achievement in achievements_data
+        ]
+    except DataParsingError as e:
+        return [app, e]
+    except MALFORMED_ERRORS as e:
+        return [app, DataParsingError(appid, reason=f"Malformed achievements: {e!r}")]
+    return [app]
+
+
+async def stream_apps(
+    appids: Iterable[int],
+    *,
+    achievements: bool = True,
+    concurrency: int = BATCH_SIZE,
+    client: httpx.AsyncClient | None = None,
+) -> AsyncIterator[StreamResult]:
+    """Yield the app (or the error) of each appid as it arrives
+
+    With achievements, apps that have achievements are yielded with their
+    percentages. Uses the navigator's client unless one is given.
+    """
+    appids = iter(appids)
+    async with nullcontext(client) if client else navigator.new_client() as http:
+        pending = {
+            asyncio.create_task(fetch_app(http, appid, achievements))
+            for appid in islice(appids, concurrency)
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    for result in task.result():
+                        yield result
+                    for appid in islice(appids, 1):
+                        pending.add(
+                            asyncio.create_task(fetch_app(http, appid, achievements))
+                        )
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,198 @@
+"""Trace of a crawl: one JSONL event per request and per database write
+
+    python steam2sqlite/main.py --trace trace.jsonl
+    python scripts/trace_report.py trace.jsonl
+
+Every event has its "event" type, the unix "time" it ended and the "appid" it's for
+(null when it isn't for a single app). Durations are in seconds.
+
+request: a request made by navigator.get, with its "host", "attempt" (1 for the
+    first try of a url), "status" (null when no response came back), "error",
+    "bytes" of the response body and the time it spent:
+    queued   waiting for the host's rate limit
+    pool     waiting for a connection of the client's pool
+    connect  opening the TCP connection, DNS included (0 on a kept alive connection)
+    tls      the TLS handshake (0 on a kept alive connection)
+    ttfb     from after the rate limit to the response headers
+    total    from after the rate limit to the end of the response body
+write: a write of the handler (TRACED_WRITES), with its "op", its "duration" and
+    the part of it spent in "commit" (flush and COMMIT)
+commit: a commit made outside of the traced writes, e.g. the achievements of a batch
+"""
+
+import json
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TextIO
+
+import httpx
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from steam2sqlite import handler, navigator
+
+
+def appid_of_data(data: dict) -> int:
+    return int(next(iter(data)))
+
+
+# (owner, attribute, appid from the call's arguments) of the writes traced in a crawl
+TRACED_WRITES = [
+    (handler, "import_single_app", lambda args: appid_of_data(args[1])),
+    (handler, "attach_achievements_to_app", lambda args: args[2].appid),
+    (handler, "record_appid_error", lambda args: args[1]),
+    (handler, "record_appid_alias", lambda args: args[1]),
+]
+
+
+def appid_of_url(url: str) -> int | None:
+    """appid of a store (appids=) or Web API (gameid=) url"""
+    params = httpx.URL(url).params
+    appid = params.get("appids") or params.get("gameid")
+    return int(appid) if appid and appid.isdigit() else None
+
+
+class RequestTrace:
+    """Timings of a request, from the trace extension of httpx's transport"""
+
+    def __init__(self, tracer: "Tracer", url: str, attempt: int, queued: float):
+        self.tracer = tracer
+        self.url = url
+        self.attempt = attempt
+        self.queued = queued
+        self.start = time.perf_counter()
+        # "<name>.started" and "<name>.complete" of the transport's steps
+        self.marks: dict[str, float] = {}
+        self.finished = False
+        self.extensions = {"trace": self.mark}
+
+    async def mark(self, name: str, info: dict):
+        self.marks[name.partition(".")[2]] = time.perf_counter()
+
+    def step(self, name: str) -> float:
+        """Duration of a step, 0 if the transport didn't take it"""
+        if f"{name}.complete" not in self.marks:
+            return 0.0
+        return self.marks[f"{name}.complete"] - self.marks[f"{name}.started"]
+
+    def finish(
+        self,
+        response: httpx.Response | None = None,
+        error: BaseException | None = None,
+    ):
+        self.finished = True
+        end = time.perf_counter()
+        first_step = min(self.marks.values(), default=None)
+        headers = self.marks.get("receive_response_headers.complete")
+        self.tracer.write(
+            {
+                "event": "request",
+                "appid": appid_of_url(self.url),
+                "host": httpx.URL(self.url).host,
+                "attempt": self.attempt,
+                "status": response.status_code if response is not None else None,
+                "error": type(error).__name__ if error is not None else None,
+                "bytes": len(response.content) if response is not None else 0,
+                "queued": self.queued,
+                "pool": first_step - self.start if first_step else None,
+                "connect": self.step("connect_tcp"),
+                "tls": self.step("start_tls"),
+                "ttfb": headers - self.start if headers else None,
+                "total": end - self.start,
+            }
+        )
+
+
+class Tracer:
+    """Writes the trace events of a crawl to a JSONL file
+
+    install() hooks the tracer into navigator.get, the TRACED_WRITES and the commits
+    of every Session, uninstall() removes the hooks.
+    """
+
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.events: Counter[str] = Counter()
+        # retries of a url are counted until it succeeds
+        self.attempts: Counter[str] = Counter()
+        self._writes: list[dict] = []
+        self._commit_start = 0.0
+        self._patched: list[tuple[object, str, object]] = []
+
+    def write(self, trace_event: dict):
+        self.events[trace_event["event"]] += 1
+        trace_event["time"] = time.time()
+        self.file.write(json.dumps(trace_event) + "\n")
+
+    def request(self, url: str, queued: float) -> RequestTrace:
+        self.attempts[url] += 1
+        return RequestTrace(self, url, self.attempts[url], queued)
+
+    def request_done(self, url: str):
+        """The url succeeded or was given up on, its retries aren't counted anymore"""
+        del self.attempts[url]
+
+    def wrap(self, op: str, func, get_appid):
+        def inner(*args, **kwargs):
+            write = {
+                "event": "write",
+                "op": op,
+                "appid": get_appid(args),
+                "commit": 0.0,
+            }
+            self._writes.append(write)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                write["duration"] = time.perf_counter() - start
+                self._writes.remove(write)
+                self.write(write)
+
+        return inner
+
+    def before_commit(self, session):
+        self._commit_start = time.perf_counter()
+
+    def after_commit(self, session):
+        duration = time.perf_counter() - self._commit_start
+        if self._writes:
+            self._writes[-1]["commit"] += duration
+        else:
+            self.write({"event": "commit", "appid": None, "duration": duration})
+
+    def install(self):
+        navigator.tracer = self
+        for owner, attr, get_appid in TRACED_WRITES:
+            func = getattr(owner, attr)
+            self._patched.append((owner, attr, func))
+            setattr(owner, attr, self.wrap(attr, func, get_appid))
+        event.listen(Session, "before_commit", self.before_commit)
+        event.listen(Session, "after_commit", self.after_commit)
+
+    def uninstall(self):
+        navigator.tracer = None
+        while self._patched:
+            owner, attr, func = self._patched.pop()
+            setattr(owner, attr, func)
+        event.remove(Session, "before_commit", self.before_commit)
+        event.remove(Session, "after_commit", self.after_commit)
+        self.file.flush()
+
+
+@contextmanager
+def trace_crawl(path: str | Path) -> Iterator[Tracer]:
+    """Tracer writing to path, installed until the context exits"""
+    with open(path, "w") as trace_file:
+        tracer = Tracer(trace_file)
+        tracer.install()
+        try:
+            yield tracer
+        finally:
+            if navigator.tracer is tracer:
+                tracer.uninstall()
+            logger.info(f"Trace written to {path}: {dict(tracer.events)}")
@@ -1,28 +1,42 @@
-import time
-from functools import wraps
-from itertools import zip_longest
-
-
-def grouper(iterable, n, fillvalue=None):
-    """Collect data into non-overlapping fixed-length chunks or blocks"""
-    # https://docs.python.org/3/library/itertools.html#itertools-recipes
-    # grouper('ABCDEFG', 3, 'x') --> ABC DEF Gxx
-    args = [iter(iterable)] * n
-    return zip_longest(*args, fillvalue=fillvalue)
-
-
-def delay_by(amount):
-    def decorator_delay_by(func):
-        @wraps(func)
-        def inner(*args, **kwargs):
-            begin = time.time()
-            result = func(*args, **kwargs)
-            end = time.time()
-            to_sleep = max(amount - (end - begin), 0)
-            if to_sleep > 0:
-                time.sleep(to_sleep)
-            return result
-
-        return inner
-
-    return decorator_delay_by
+from argparse import ArgumentTypeError
+
+from steam2sqlite.lanes import LANE_WEIGHTS
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard argument "i/N" into (i, N), with 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ArgumentTypeError(f"shard must be formatted as i/N, got: {value}")
+    if not 0 <= index < count:
+        raise ArgumentTypeError(f"shard index must be in [0, {count}), got: {index}")
+    return index, count
+
+
+def parse_lane_weight(value: str) -> tuple[str, int]:
+    """Parse a lane weight argument "LANE=WEIGHT" into (LANE, WEIGHT)"""
+    lane, _, weight = value.partition("=")
+    if lane not in LANE_WEIGHTS:
+        raise ArgumentTypeError(
+            f"lane must be one of {', '.join(LANE_WEIGHTS)}, got: {lane}"
+        )
+    try:
+        weight_value = int(weight)
+    except ValueError:
+        raise ArgumentTypeError(f"lane weight must be an integer, got: {weight}")
+    if weight_value < 0:
+        raise ArgumentTypeError(f"lane weight must be >= 0, got: {weight_value}")
+    return lane, weight_value
+
+
+def in_shard(appid: int, shard: tuple[int, int]) -> bool:
+    index, count = shard
+    return hash(appid) % count == index
+
+
+def shard_file_name(file_name: str, shard: tuple[int, int]) -> str:
+    """database.db -> database.shard-0-of-4.db"""
+    index, count = shard
+    stem, dot, suffix = file_name.rpartition(".")
+    return f"{stem}.shard-{index}-of-{count}{dot}{suffix}"
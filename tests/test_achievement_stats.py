@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import achievement_stats, handler, models
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def portal_app(session):
+    with open("test_data/620.json") as app_data_file:
+        return handler.import_single_app(session, json.load(app_data_file))
+
+
+@pytest.fixture
+def portal_achievements() -> list[dict]:
+    with open("test_data/620_achievements.json") as app_achievement_fh:
+        return json.load(app_achievement_fh)["achievementpercentages"]["achievements"]
+
+
+def test_stats(session: Session, portal_app: models.SteamApp):
+    achievements = [
+        {"name": "common", "percent": 100.0},
+        {"name": "rare", "percent": 0.5},
+        {"name": "typical", "percent": 10.0},
+        {"name": "never", "percent": 0.0},
+    ]
+    handler.store_apps_achievements(session, [(portal_app, achievements)])
+    assert session.get(models.AchievementStats, 620).dict() == {
+        "appid": 620,
+        "achievements": 4,
+        "min_percent": 0.0,
+        "median_percent": pytest.approx(5.25),
+        "mean_percent": pytest.approx(27.625),
+        "max_percent": 100.0,
+        "rare_achievements": 2,
+        "rarest_achievement": "never",
+        # (0 + 2.3 + 1 + 4) / 4
+        "difficulty": pytest.approx(1.825, abs=0.001),
+    }
+
+    # the middle achievement of an odd number of them
+    achievements.append({"name": "half", "percent": 50.0})
+    handler.store_apps_achievements(session, [(portal_app, achievements)])
+    session.expire_all()
+    assert session.get(models.AchievementStats, 620).median_percent == 10.0
+
+    for achievement in portal_app.achievements:
+        session.delete(achievement)
+    achievement_stats.update_apps_stats(session, [portal_app])
+    session.expire_all()
+    assert session.get(models.AchievementStats, 620) is None
+
+
+def test_stats_stored_with_achievements(
+    session: Session, portal_app: models.SteamApp, portal_achievements
+):
+    handler.store_apps_achievements(session, [(portal_app, portal_achievements)])
+    stats = session.get(models.AchievementStats, 620)
+    assert stats.achievements == len(portal_achievements)
+    assert stats.min_percent == min(float(a["percent"]) for a in portal_achievements)
+
+    # updated in place
+    portal_achievements[0]["percent"] = 0.001
+    handler.store_apps_achievements(session, [(portal_app, portal_achievements)])
+    session.expire_all()
+    stats = session.get(models.AchievementStats, 620)
+    assert stats.min_percent == 0.001
+    assert stats.rarest_achievement == portal_achievements[0]["name"]
+
+
+def test_backfill(session: Session, portal_app: models.SteamApp, portal_achievements):
+    handler.store_apps_achievements(session, [(portal_app, portal_achievements)])
+    stored = session.get(models.AchievementStats, 620).dict()
+    session.delete(session.get(models.AchievementStats, 620))
+    session.commit()
+
+    assert achievement_stats.backfill(session) == 1
+    assert session.get(models.AchievementStats, 620).dict() == stored
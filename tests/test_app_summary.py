@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import achievement_stats, app_summary, handler, models
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def portal_app(session):
+    with open("test_data/620.json") as app_data_file:
+        return handler.import_single_app(session, json.load(app_data_file))
+
+
+@pytest.fixture
+def portal_achievements() -> list[dict]:
+    with open("test_data/620_achievements.json") as app_achievement_fh:
+        return json.load(app_achievement_fh)["achievementpercentages"]["achievements"]
+
+
+def test_summary_stored_with_app(session: Session, portal_app: models.SteamApp):
+    # genres and categories are listed in the order of their ids
+    summary = session.get(models.AppSummary, 620)
+    assert summary.name == portal_app.name == "Portal 2"
+    assert summary.release_date == portal_app.release_date
+    assert summary.current_price == portal_app.current_price
+    assert json.loads(summary.genres) == [
+        genre.description
+        for genre in sorted(portal_app.genres, key=lambda genre: genre.id)
+    ]
+    assert json.loads(summary.categories) == [
+        category.description
+        for category in sorted(portal_app.categories, key=lambda category: category.id)
+    ]
+    assert summary.achievements == 0
+    assert summary.difficulty is None
+    assert summary.updated == portal_app.updated
+
+
+def test_summary_stored_with_achievements(
+    session: Session, portal_app: models.SteamApp, portal_achievements
+):
+    handler.store_apps_achievements(session, [(portal_app, portal_achievements)])
+    session.expire_all()
+    summary = session.get(models.AppSummary, 620)
+    stats = session.get(models.AchievementStats, 620)
+    assert summary.achievements == stats.achievements == len(portal_achievements)
+    assert summary.median_percent == stats.median_percent
+    assert summary.difficulty == stats.difficulty
+
+
+def test_backfill(session: Session, portal_app: models.SteamApp, portal_achievements):
+    handler.store_apps_achievements(session, [(portal_app, portal_achievements)])
+    stored = session.get(models.AppSummary, 620).dict()
+    session.delete(session.get(models.AppSummary, 620))
+    session.commit()
+
+    assert app_summary.backfill(session) == 1
+    assert session.get(models.AppSummary, 620).dict() == stored
+
+
+def test_achievement_stats_backfill(
+    session: Session, portal_app: models.SteamApp, portal_achievements
+):
+    # achievements stored without their statistics, e.g. before the stats existed
+    handler.attach_achievements_to_app(session, portal_achievements, portal_app)
+    session.commit()
+    assert session.get(models.AppSummary, 620).achievements == 0
+
+    achievement_stats.backfill(session)
+    session.expire_all()
+    summary = session.get(models.AppSummary, 620)
+    assert summary.achievements == len(portal_achievements)
+    assert summary.difficulty == session.get(models.AchievementStats, 620).difficulty
+
+
+def test_main_missing_database(tmp_path):
+    assert app_summary.main([str(tmp_path / "missing.db")]) == 2
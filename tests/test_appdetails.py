@@ -0,0 +1,92 @@
+import json
+from datetime import date
+
+import httpx
+import pytest
+
+from steam2sqlite import appdetails
+from steam2sqlite.appdetails import APP_FIELDS, Field, parse_app_data
+
+
+@pytest.fixture
+def portal_data() -> dict:
+    with open("test_data/620.json") as app_data_file:
+        return json.load(app_data_file)["620"]["data"]
+
+
+def test_parse_app_data(portal_data):
+    assert parse_app_data(portal_data) == {
+        "appid": 620,
+        "type": "game",
+        "is_free": False,
+        "name": "Portal 2",
+        "controller_support": "full",
+        "metacritic_score": 95,
+        "metacritic_url": "https://www.metacritic.com/game/pc/portal-2?ftag=MCD-06-10aaa1f",
+        "recommendations": 215926,
+        "achievements_total": 51,
+        "release_date": date(2011, 4, 19),
+        "initial_price": 999,
+        "current_price": 199,
+    }
+
+
+def test_filtered_data_parses_the_same(portal_data):
+    """The sections of the filters hold everything the spec reads"""
+    read = {field.path[0] for field in APP_FIELDS.values()}
+    read |= set(appdetails.LINK_SECTIONS)
+    filtered = {key: value for key, value in portal_data.items() if key in read}
+    assert parse_app_data(filtered) == parse_app_data(portal_data)
+    assert len(json.dumps(filtered)) < len(json.dumps(portal_data)) / 3
+
+
+def test_missing_sections(portal_data):
+    for key in ("metacritic", "achievements", "price_overview", "release_date"):
+        del portal_data[key]
+    portal_data["recommendations"] = None
+    parsed = parse_app_data(portal_data)
+    assert parsed["metacritic_score"] is None
+    assert parsed["recommendations"] is None
+    assert parsed["achievements_total"] == 0
+    assert parsed["release_date"] is None
+    assert parsed["current_price"] is None
+
+    del portal_data["name"]
+    with pytest.raises(KeyError):
+        parse_app_data(portal_data)
+
+
+@pytest.mark.parametrize(
+    "release_date, expected",
+    [
+        ({"coming_soon": False, "date": "18 Apr, 2011"}, None),
+        ({"coming_soon": True, "date": "Apr 18, 2011"}, None),
+        ({"coming_soon": False, "date": ""}, None),
+        ({"coming_soon": False, "date": "Apr 18, 2011"}, date(2011, 4, 18)),
+    ],
+)
+def test_parse_release_date(release_date, expected):
+    assert appdetails.parse_release_date(release_date) == expected
+
+
+def test_field_reader():
+    read = appdetails.field_reader(Field(("a", "b"), "a", default=0, parse=str))
+    assert read({"a": {"b": 1}}) == "1"
+    assert read({"a": {"b": None}}) is None
+    assert read({"a": []}) == 0
+    assert read({}) == 0
+
+
+def test_appdetails_url():
+    url = httpx.URL(appdetails.appdetails_url(620))
+    assert url.params["appids"] == "620"
+    assert url.params["filters"].split(",") == [
+        "basic",
+        "metacritic",
+        "recommendations",
+        "achievements",
+        "release_date",
+        "price_overview",
+        "genres",
+        "categories",
+    ]
@@ -0,0 +1,109 @@
+import gzip
+import json
+import shutil
+import sqlite3
+
+import changeset
+from sqlmodel import Session, create_engine, select
+
+from steam2sqlite import handler, models
+
+
+def load_app(session, appid: int, **changes) -> models.SteamApp:
+    with open("test_data/620.json") as app_data_file:
+        data = json.load(app_data_file)["620"]
+    data["data"] |= {"steam_appid": appid} | changes
+    return handler.import_single_app(session, {str(appid): data})
+
+
+def test_export_and_apply(tmp_path):
+    source_path = tmp_path / "source.db"
+    engine = create_engine(f"sqlite:///{source_path}", echo=False)
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        load_app(session, 620)
+        load_app(session, 1000)
+
+    # a consumer with a full copy of the database
+    target_path = tmp_path / "target.db"
+    apps, watermark = changeset.export_changeset(source_path, tmp_path / "full.db.gz")
+    assert apps == 2
+    shutil.copy(source_path, target_path)
+
+    with Session(engine) as session:
+        app = load_app(session, 1000, name="new name")
+        with open("test_data/620_achievements.json") as app_achievement_fh:
+            achievements = json.load(app_achievement_fh)["achievementpercentages"]
+        handler.store_apps_achievements(session, [(app, achievements["achievements"])])
+
+    changeset_path = tmp_path / "changeset.db.gz"
+    apps, new_watermark = changeset.export_changeset(
+        source_path, changeset_path, since=watermark
+    )
+    assert apps == 1
+    assert new_watermark > watermark
+
+    assert changeset.apply_changeset(target_path, changeset_path) == new_watermark
+
+    target_engine = create_engine(f"sqlite:///{target_path}", echo=False)
+    with Session(target_engine) as session:
+        apps = session.exec(select(models.SteamApp).order_by(models.SteamApp.appid))
+        portal, new_app = apps.all()
+        assert portal.name == "Portal 2"
+        assert new_app.name == "new name"
+        assert len(new_app.achievements) == new_app.achievements_total
+        assert len(new_app.genres) == len(portal.genres)
+        assert session.get(models.AppSummary, 1000).name == "new name"
+
+
+def test_changeset_propagates_deletions(tmp_path):
+    source_path = tmp_path / "source.db"
+    engine = create_engine(f"sqlite:///{source_path}", echo=False)
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        load_app(session, 620)
+        load_app(session, 1000)
+        handler.record_appid_error(session, 10, reason="not found")
+        handler.record_appid_error(session, 20, reason="not found")
+
+    target_path = tmp_path / "target.db"
+    _, watermark = changeset.export_changeset(source_path, tmp_path / "full.db.gz")
+    shutil.copy(source_path, target_path)
+
+    with Session(engine) as session:
+        session.delete(session.get(models.SteamApp, 1000))
+        session.commit()
+        handler.clear_appid_error(session, 10)
+
+    changeset_path = tmp_path / "changeset.db.gz"
+    apps, new_watermark = changeset.export_changeset(
+        source_path, changeset_path, since=watermark
+    )
+    assert apps == 0
+    assert new_watermark > watermark
+
+    # only the deletions, none of the unchanged rows
+    changeset_db = tmp_path / "changeset.db"
+    with gzip.open(changeset_path) as src, open(changeset_db, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    conn = sqlite3.connect(changeset_db)
+    for table in ("genre", "category", "appid_error"):
+        assert conn.execute(f"SELECT count(*) FROM {table}").fetchone() == (0,)
+    assert sorted(conn.execute("SELECT table_name, appid FROM tombstone")) == [
+        ("appid_error", 10),
+        ("steam_app", 1000),
+    ]
+    conn.close()
+
+    changeset.apply_changeset(target_path, changeset_path)
+
+    target_engine = create_engine(f"sqlite:///{target_path}", echo=False)
+    with Session(target_engine) as session:
+        assert session.exec(select(models.SteamApp.appid)).all() == [620]
+        assert session.exec(select(models.AppidError.appid)).all() == [20]
+        assert not session.exec(
+            select(models.GenreSteammAppLink).where(
+                models.GenreSteammAppLink.appid == 1000
+            )
+        ).all()
+        assert session.get(models.AppSummary, 1000) is None
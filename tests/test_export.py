@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date
+
+import export
+import pytest
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import handler, models
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "database.db"
+    engine = create_engine(f"sqlite:///{path}", echo=False)
+    models.create_db_and_tables(engine)
+    with open("test_data/620.json") as app_data_file:
+        app_data = json.load(app_data_file)
+    with open("test_data/620_achievements.json") as achievements_file:
+        achievements = json.load(achievements_file)["achievementpercentages"][
+            "achievements"
+        ]
+    with Session(engine) as session:
+        app = handler.import_single_app(session, app_data)
+        handler.store_apps_achievements(session, [(app, achievements)])
+        updated = app.updated
+    return path, updated
+
+
+def test_export_parquet(database, tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path, updated = database
+    # several chunks per table
+    monkeypatch.setattr(export, "CHUNK_ROWS", 10)
+
+    assert export.main([str(path), str(tmp_path / "export")]) == 0
+
+    achievements = pq.read_table(tmp_path / "export/achievement.parquet")
+    assert achievements.num_rows == 51
+    assert str(achievements.schema.field("name").type) == (
+        "dictionary<values=string, indices=int32, ordered=0>"
+    )
+
+    apps = pq.read_table(tmp_path / "export/apps.parquet").to_pylist()
+    assert len(apps) == 1
+    assert apps[0]["appid"] == 620
+    assert apps[0]["name"] == "Portal 2"
+    assert apps[0]["is_free"] is False
+    assert apps[0]["release_date"] == date(2011, 4, 19)
+    assert apps[0]["updated"] == updated
+    assert apps[0]["genres"] == ["Action", "Adventure"]
+    assert "Steam Achievements" in apps[0]["categories"]
+    assert not list((tmp_path / "export").glob("*.partial"))
+
+
+def test_export_csv(database, tmp_path):
+    path, updated = database
+    assert export.main([str(path), str(tmp_path / "export"), "--format", "csv"]) == 0
+
+    counts = {}
+    with zipfile.ZipFile(tmp_path / "export/tables.csv.zip") as archive:
+        assert "genresteammapplink.csv" in archive.namelist()
+        for name in ("steam_app", "achievement", "achievement_stats", "apps"):
+            with archive.open(f"{name}.csv") as entry:
+                counts[name] = list(csv.DictReader(io.TextIOWrapper(entry, "utf-8")))
+    assert not list((tmp_path / "export").glob("*.partial"))
+    assert {name: len(rows) for name, rows in counts.items()} == {
+        "steam_app": 1,
+        "achievement": 51,
+        "achievement_stats": 1,
+        "apps": 1,
+    }
+    app = counts["apps"][0]
+    assert app["updated"] == updated.isoformat()
+    assert app["release_date"] == "2011-04-19"
+    assert json.loads(app["genres"]) == ["Action", "Adventure"]
+
+
+def test_export_without_pyarrow(database, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(export, "pa", None)
+    path, _ = database
+    args = [str(path), str(tmp_path / "export"), "--format", "parquet"]
+    assert export.main(args) == 2
+    assert "pyarrow" in capsys.readouterr().out
+
+
+def test_column_kind():
+    assert export.column_kind("updated", "INTEGER") == "timestamp"
+    assert export.column_kind("appid", "INTEGER") == "int"
+    assert export.column_kind("percent", "FLOAT") == "float"
+    assert export.column_kind("is_free", "BOOLEAN") == "bool"
+    assert export.column_kind("release_date", "DATE") == "date"
+    assert export.column_kind("name", "VARCHAR") == "string"
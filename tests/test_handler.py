@@ -1,9 +1,11 @@
 import json
+from datetime import timedelta
 
+import httpx
 import pytest
-from sqlmodel import Session, create_engine, select
+from sqlmodel import Session, create_engine, select, text
 
-from steam2sqlite import handler, models
+from steam2sqlite import handler, models, schedule
 
 steam_appids_names = {620: "Portal 2", 659: "Portal 2 - Pre-order"}
 SQLITE_URL = "sqlite://"
@@ -76,6 +78,14 @@ def test_app_with_duplicated_appid(session):
         handler.import_single_app(session, dup_app_data)
 
 
+def test_app_with_duplicated_appid_is_an_alias(session):
+    dup_app_data = get_apps_data(["659"])[0]
+
+    with pytest.raises(handler.AppidAliasError) as exc_info:
+        handler.import_single_app(session, dup_app_data)
+    assert exc_info.value.target_appid == 620
+
+
 def test_ingest_item_twice(session: Session):
     appid = "620"
     app_data = get_apps_data([appid])[0]
@@ -233,3 +243,186 @@ def test_price_update(session: Session, portal_app: models.SteamApp):
 
     updated_app = handler.import_single_app(session, app_data)
     assert updated_app.current_price == 1
+
+
+def test_app_counts(session: Session, portal_app: models.SteamApp):
+    """Count tables are kept up to date as apps are stored"""
+    year_counts = session.exec(select(models.AppYearCount)).all()
+    assert [(c.year, c.type, c.controller_support, c.apps) for c in year_counts] == [
+        (2011, "game", "full", 1)
+    ]
+    genre_counts = session.exec(select(models.GenreAppCount)).all()
+    assert {(c.genre_pk, c.apps) for c in genre_counts} == {
+        (genre.pk, 1) for genre in portal_app.genres
+    }
+
+    # move the release year and drop a genre
+    app_data = get_apps_data(["620"])[0]
+    app_data["620"]["data"]["release_date"]["date"] = "Apr 19, 2012"
+    app_data["620"]["data"]["genres"] = app_data["620"]["data"]["genres"][:1]
+    handler.import_single_app(session, app_data)
+
+    year_counts = session.exec(select(models.AppYearCount)).all()
+    assert [(c.year, c.apps) for c in year_counts] == [(2012, 1)]
+    genre_counts = session.exec(
+        select(models.GenreAppCount).order_by(models.GenreAppCount.genre_pk)
+    ).all()
+    assert [c.apps for c in genre_counts] == [1, 0]
+    category_counts = session.exec(select(models.CategoryAppCount)).all()
+    assert len(category_counts) == len(portal_app.categories)
+
+
+def test_app_name_search(session: Session, portal_app: models.SteamApp):
+    """The full-text index follows the app names"""
+
+    def search(query: str) -> list[int]:
+        return (
+            session.exec(
+                text(
+                    "SELECT rowid FROM steam_app_fts WHERE steam_app_fts MATCH :query"
+                ).bindparams(query=query)
+            )
+            .scalars()
+            .all()
+        )
+
+    assert search("portal") == [portal_app.appid]
+    assert search("port*") == [portal_app.appid]
+
+    app_data = get_apps_data(["620"])[0]
+    app_data["620"]["data"]["name"] = "Pörtal Reloaded"
+    handler.import_single_app(session, app_data)
+
+    assert search("portal 2") == []
+    assert search("portal reloaded") == [portal_app.appid]
+
+
+def test_timestamps_stored_as_integers(session: Session, portal_app: models.SteamApp):
+    created, updated = session.exec(
+        text("SELECT typeof(created), typeof(updated) FROM steam_app")
+    ).one()
+    assert (created, updated) == ("integer", "integer")
+
+    updated = portal_app.updated
+    session.expire(portal_app)
+    assert portal_app.updated == updated
+
+
+def test_get_apps_data_and_achievements(
+    session: Session, portal_app: models.SteamApp, monkeypatch
+):
+    """App data and achievements are requested together and split back up"""
+    app_data = get_apps_data(["620"])[0]
+    achievements = get_apps_achievements([portal_app])[0][1]
+
+    async def make_requests(urls):
+        assert len(urls) == 2
+        return [
+            httpx.Response(200, json=app_data, request=httpx.Request("GET", urls[0])),
+            httpx.Response(
+                200,
+                json={"achievementpercentages": {"achievements": achievements}},
+                request=httpx.Request("GET", urls[1]),
+            ),
+        ]
+
+    monkeypatch.setattr(handler.navigator, "make_requests", make_requests)
+
+    apps_data, apps_achievements_data = handler.get_apps_data_and_achievements(
+        session, steam_appids_names, [620, None], [portal_app]
+    )
+    assert apps_data == [app_data]
+    assert apps_achievements_data == [(portal_app, achievements)]
+
+
+def test_achievements_schedule(
+    session: Session, portal_app: models.SteamApp, portal_achievements
+):
+    """Stable achievements are refreshed less often, until their number changes"""
+    assert portal_app.achievements_interval == 3
+    first_due = portal_app.achievements_due
+
+    handler.store_apps_achievements(session, get_apps_achievements([portal_app]))
+    assert portal_app.achievements_interval == 6
+    assert portal_app.achievements_due > first_due
+
+    app_data = get_apps_data(["620"])[0]
+    handler.import_single_app(session, app_data)
+    assert portal_app.achievements_due is not None
+
+    app_data["620"]["data"]["achievements"]["total"] += 1
+    handler.import_single_app(session, app_data)
+    assert portal_app.achievements_due is None
+
+
+def test_refresh_schedule(session: Session, portal_app: models.SteamApp):
+    """Apps are refreshed less often while their data doesn't change"""
+    assert portal_app.refresh_interval == 2
+    app_data = get_apps_data(["620"])[0]
+
+    handler.import_single_app(session, app_data)
+    assert portal_app.refresh_interval == 4
+
+    app_data["620"]["data"]["price_overview"]["final"] = 1
+    handler.import_single_app(session, app_data)
+    assert portal_app.refresh_interval == 2
+
+    handler.import_single_app(session, app_data)
+    assert portal_app.refresh_interval == 4
+    app_data["620"]["data"]["genres"] = app_data["620"]["data"]["genres"][:1]
+    handler.import_single_app(session, app_data)
+    assert portal_app.refresh_interval == 2
+
+    app_data["620"]["data"]["release_date"]["coming_soon"] = True
+    handler.import_single_app(session, app_data)
+    assert portal_app.refresh_interval == 0.5
+    assert portal_app.refresh_due < portal_app.updated + timedelta(days=1)
+
+
+def test_error_retries(session: Session):
+    apps = handler.store_apps_data(session, {1: "gone"}, [{"1": {"success": False}}])
+    assert apps == []
+    error = session.exec(select(models.AppidError)).one()
+    assert error.updated is not None
+
+    now = error.updated
+    assert handler.get_retry_appids(session, now) == []
+    retry_at = now + timedelta(days=schedule.ERROR_RETRY_INTERVAL)
+    assert handler.get_retry_appids(session, retry_at) == [1]
+
+    # failing again updates the error rather than adding another
+    handler.record_appid_error(session, 1, "gone", "other reason")
+    assert session.exec(select(models.AppidError)).one().reason == "other reason"
+    assert handler.get_retry_appids(session, retry_at) == []
+
+    # the error is cleared once the app is stored
+    handler.record_appid_error(session, 620, "Portal 2")
+    handler.store_apps_data(session, steam_appids_names, get_apps_data(["620"]))
+    assert handler.get_error_appids(session) == [1]
+
+
+def test_appid_aliases(session: Session):
+    """659 resolves to 620, it's recorded as an alias rather than an error"""
+    apps = handler.store_apps_data(
+        session, steam_appids_names, get_apps_data(["659", "620"])
+    )
+    assert [app.appid for app in apps] == [620]
+    assert handler.get_error_appids(session) == []
+    assert handler.get_appid_aliases(session) == {659: 620}
+
+    # the alias is left out of the crawl, the app it resolves to stays in
+    assert handler.resolve_aliases(session, steam_appids_names) == {620: "Portal 2"}
+    assert handler.resolve_aliases(session, {659: "Portal 2 - Pre-order"}) == {
+        620: "Portal 2 - Pre-order"
+    }
+
+
+def test_achievements_due_appids(session: Session, portal_app: models.SteamApp):
+    now = portal_app.updated
+    assert handler.get_achievements_due_appids(session, now) == [620]
+
+    handler.store_apps_achievements(session, get_apps_achievements([portal_app]))
+    assert handler.get_achievements_due_appids(session, now) == []
+    assert handler.get_achievements_due_appids(
+        session, portal_app.achievements_due
+    ) == [620]
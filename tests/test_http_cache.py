@@ -0,0 +1,132 @@
+import sqlite3
+
+import http_cache
+import pytest
+from datasette.app import Datasette
+from datasette.plugins import pm
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "database.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE run_stats (pk INTEGER PRIMARY KEY, ended TEXT)")
+    conn.execute("INSERT INTO run_stats (ended) VALUES ('2024-01-01 01:00:00')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def datasette(db_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "VERSION_TTL", 0)
+    pm.register(http_cache)
+    try:
+        yield Datasette(
+            [str(db_path)],
+            metadata={"plugins": {"http-cache": {"max_age": 60}}},
+        )
+    finally:
+        pm.unregister(http_cache)
+
+
+def add_run(db_path, ended: str):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO run_stats (ended) VALUES (?)", (ended,))
+    conn.commit()
+    conn.close()
+
+
+async def test_etag_and_revalidation(datasette, db_path):
+    resp = await datasette.client.get("/database/run_stats.json")
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "public, max-age=60"
+    etag = resp.headers["etag"]
+
+    resp = await datasette.client.get(
+        "/database/run_stats.json", headers={"if-none-match": etag}
+    )
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    # a new run is a new version
+    add_run(db_path, "2024-01-02 01:00:00")
+    resp = await datasette.client.get(
+        "/database/run_stats.json", headers={"if-none-match": etag}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert len(resp.json()["rows"]) == 2
+
+
+async def test_responses_are_kept_until_the_version_changes(datasette, db_path):
+    sql = "/database.json?sql=select+count(*)+as+runs+from+run_stats&_shape=array"
+    assert (await datasette.client.get(sql)).json() == [{"runs": 1}]
+
+    # changes that aren't a new run are served from the cache
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO run_stats (ended) VALUES (NULL)")
+    conn.commit()
+    conn.close()
+    assert (await datasette.client.get(sql)).json() == [{"runs": 1}]
+
+    add_run(db_path, "2024-01-02 01:00:00")
+    assert (await datasette.client.get(sql)).json() == [{"runs": 3}]
+
+
+async def test_responses_setting_cookies_are_not_cached(datasette):
+    # the messages page has a form with a csrf token
+    first = await datasette.client.get("/-/messages")
+    assert "ds_csrftoken" in first.headers["set-cookie"]
+    assert "etag" not in first.headers
+    assert "cache-control" not in first.headers
+
+    second = await datasette.client.get("/-/messages")
+    assert second.headers["set-cookie"] != first.headers["set-cookie"]
+
+
+async def test_requests_with_cookies_are_not_cached(datasette, db_path):
+    sql = "/database.json?sql=select+count(*)+as+runs+from+run_stats&_shape=array"
+    assert (await datasette.client.get(sql)).json() == [{"runs": 1}]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO run_stats (ended) VALUES (NULL)")
+    conn.commit()
+    conn.close()
+    resp = await datasette.client.get(sql, headers={"cookie": "session=1"})
+    assert resp.json() == [{"runs": 2}]
+    assert "etag" not in resp.headers
+
+
+async def test_hosts_are_cached_separately(datasette):
+    etags = set()
+    for host in ("example.com", "example.org"):
+        resp = await datasette.client.get(
+            "/database/run_stats.json", headers={"host": host}
+        )
+        assert resp.status_code == 200
+        etags.add(resp.headers["etag"])
+    assert len(etags) == 2
+
+
+async def test_no_version_no_caching(tmp_path, monkeypatch):
+    sqlite3.connect(tmp_path / "database.db").close()
+    pm.register(http_cache)
+    try:
+        datasette = Datasette([str(tmp_path / "database.db")])
+        resp = await datasette.client.get("/database.json")
+    finally:
+        pm.unregister(http_cache)
+    assert resp.status_code == 200
+    assert "etag" not in resp.headers
+
+
+def test_lru_evicts_least_recently_used():
+    lru = http_cache.LRU(max_bytes=10)
+    lru.put("a", 200, [], b"1234")
+    lru.put("b", 200, [], b"1234")
+    assert lru.get("a") is not None
+
+    lru.put("c", 200, [], b"1234")
+    assert list(lru.entries) == ["a", "c"]
+    assert lru.size == 8
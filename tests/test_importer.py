@@ -0,0 +1,105 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+import sqlalchemy.exc
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, select
+
+from steam2sqlite import handler, importer, main, models
+
+
+def test_import_directory(tmp_path, monkeypatch):
+    database = tmp_path / "database.db"
+    monkeypatch.setattr(main, "SQLITE_URL", f"sqlite:///{database}")
+    assert main.main(["--import", "test_data"]) == 0
+    assert main.main(["--import", "missing"]) == 2
+
+    engine = create_engine(f"sqlite:///{database}")
+    with Session(engine) as session:
+        app = session.get(models.SteamApp, 620)
+        assert app.name == "Portal 2"
+        assert len(app.achievements) == app.achievements_total
+        assert app.achievements_due is not None
+        assert handler.get_appid_aliases(session) == {659: 620}
+
+        run_stats = session.exec(select(models.RunStats)).one()
+        assert run_stats.apps_stored == 1
+        assert run_stats.achievements_stored == app.achievements_total
+
+
+def test_import_jsonl(tmp_path):
+    achievements = json.loads(Path("test_data/620_achievements.json").read_text())
+    lines = [
+        Path("test_data/620.json").read_text(),
+        json.dumps({"appid": 620} | achievements),
+        json.dumps({"appid": 1} | achievements),
+        "",
+    ]
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text("\n".join(line.replace("\n", "") for line in lines))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        payloads = list(importer.read_source(dump))
+        assert [(kind, appid) for kind, appid, _ in payloads] == [
+            ("app", 620),
+            ("achievements", 620),
+            ("achievements", 1),
+        ]
+
+        counts = importer.import_payloads(session, payloads, batch_size=2)
+        assert counts == Counter(apps=1, achievements=51, skipped=1)
+
+        # importing again updates the rows in place
+        importer.import_payloads(session, payloads)
+        assert len(session.exec(select(models.Achievement)).all()) == 51
+
+
+def test_batch_is_committed_once(tmp_path):
+    portal = json.loads(Path("test_data/620.json").read_text())
+    batch = [
+        ("app", 1, {"1": {"success": False}}),
+        ("app", 659, json.loads(Path("test_data/659.json").read_text())),
+        ("app", 620, portal),
+    ]
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        handler.record_appid_error(session, 620, "Portal 2")
+        commits = []
+        event.listen(session, "after_commit", commits.append)
+
+        counts = importer.import_batch(session, batch)
+        assert len(commits) == 1
+        assert counts == Counter(apps=1, aliases=1, errors=1)
+        assert handler.get_error_appids(session) == [1]
+        assert handler.get_appid_aliases(session) == {659: 620}
+
+
+def test_failed_batch_is_imported_one_at_a_time(tmp_path, monkeypatch):
+    portal = json.loads(Path("test_data/620.json").read_text())
+    payloads = [
+        ("app", 620, portal),
+        ("app", 1000, {"1000": portal["620"]}),
+    ]
+    import_single_app = handler.import_single_app
+
+    def failing_import(session, app_data, commit=True):
+        if "1000" in app_data:
+            raise sqlalchemy.exc.OperationalError("INSERT", {}, Exception("disk full"))
+        return import_single_app(session, app_data, commit=commit)
+
+    monkeypatch.setattr(handler, "import_single_app", failing_import)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    models.create_db_and_tables(engine)
+    with Session(engine) as session:
+        counts = importer.import_payloads(session, payloads)
+        assert counts == Counter(apps=1, errors=1)
+        assert session.get(models.SteamApp, 620) is not None
+        error = session.exec(select(models.AppidError)).one()
+        assert error.appid == 1000
+        assert "disk full" in error.reason
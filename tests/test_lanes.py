@@ -0,0 +1,74 @@
+from collections import Counter
+from itertools import islice
+
+import pytest
+
+from steam2sqlite.lanes import LANE_HOSTS, Lanes
+
+STORE = LANE_HOSTS["new"]
+API = LANE_HOSTS["achievements"]
+
+
+def test_picks_are_weighted_and_interleaved():
+    lanes = Lanes(
+        {"new": range(1000), "refresh": range(1000)}, {"new": 3, "refresh": 1}
+    )
+
+    picks = [lane for lane, _ in islice(lanes, 8)]
+    assert Counter(picks) == {"new": 6, "refresh": 2}
+    # smooth: the refreshes aren't held back until the end of a round
+    assert picks[:4].count("refresh") == 1
+
+
+def test_lanes_are_not_starved():
+    lanes = Lanes({"new": range(10_000), "retry": [1, 2]}, {"new": 100, "retry": 1})
+
+    assert ("retry", 1) in list(islice(lanes, 101))
+
+
+def test_empty_lanes_give_up_their_share():
+    lanes = Lanes(
+        {"new": [1, 2, 3], "refresh": [4, 5, 6, 7, 8, 9], "retry": []},
+        {"new": 1, "refresh": 1, "retry": 5},
+    )
+
+    picks = list(lanes)
+    assert [appid for _, appid in picks[:6]] == [1, 4, 2, 5, 3, 6]
+    assert [appid for _, appid in picks[6:]] == [7, 8, 9]
+
+
+def test_zero_weight_lanes_are_paused():
+    lanes = Lanes({"new": [1, 2], "retry": [3]}, {"new": 1, "retry": 0})
+
+    assert list(lanes) == [("new", 1), ("new", 2)]
+    assert lanes.depths() == {"new": 0, "retry": 1}
+    assert lanes.etas({STORE: 1}) == {"new": 0, "retry": None}
+    assert lanes.report({STORE: 1}) == "new: 0 queued, retry: 1 queued, paused"
+
+
+def test_etas():
+    lanes = Lanes(
+        {"new": range(10), "refresh": range(30), "retry": []},
+        {"new": 1, "refresh": 1, "retry": 1},
+    )
+
+    # new and refresh share the rate until new drains after 20 picks, then
+    # refresh gets all of it for its remaining 20
+    assert lanes.etas({STORE: 2}) == {
+        "new": pytest.approx(10),
+        "refresh": pytest.approx(20),
+        "retry": 0,
+    }
+    assert "refresh: 30 queued" in lanes.report({STORE: 2})
+
+
+def test_etas_per_host():
+    lanes = Lanes(
+        {"new": range(10), "achievements": range(30)}, {"new": 1, "achievements": 1}
+    )
+
+    # achievements are requested from the Web API, at its own rate
+    assert lanes.etas({STORE: 2, API: 3}) == {
+        "new": pytest.approx(5),
+        "achievements": pytest.approx(10),
+    }
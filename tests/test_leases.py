@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, select
+
+from steam2sqlite import leases, models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = leases.shared_engine(f"sqlite:///{tmp_path / 'database.db'}")
+    models.create_db_and_tables(engine)
+    return engine
+
+
+def test_claim(engine):
+    now = datetime(2024, 1, 1)
+    with Session(engine) as first, Session(engine) as second:
+        assert leases.claim(first, "first", [3, 1, 2], now) == [3, 1, 2]
+        # held appids are skipped, the others are claimed
+        assert leases.claim(second, "second", [2, 4], now) == [4]
+        # owners can claim their own leases again
+        assert leases.claim(first, "first", [1, 4], now) == [1]
+
+
+def test_expired_leases_are_claimed(engine):
+    now = datetime(2024, 1, 1)
+    with Session(engine) as first, Session(engine) as second:
+        leases.claim(first, "crashed", [1, 2], now)
+        later = now + leases.LEASE_DURATION
+        assert leases.claim(second, "second", [1, 2], later) == [1, 2]
+        assert leases.renew(first, "crashed", [1, 2], later) == []
+
+
+def test_renew(engine):
+    now = datetime(2024, 1, 1)
+    with Session(engine) as session:
+        leases.claim(session, "first", [1], now)
+        later = now + leases.LEASE_DURATION / 2
+        assert leases.renew(session, "first", [1], later) == [1]
+        lease = session.get(models.AppidLease, 1)
+        assert lease.expires == later + leases.LEASE_DURATION
+
+
+def test_release(engine):
+    with Session(engine) as first, Session(engine) as second:
+        leases.claim(first, "first", [1, 2])
+        # only the owner's leases are released
+        leases.release(second, "second", [1])
+        leases.release(first, "first", [2])
+        assert first.exec(select(models.AppidLease.appid)).all() == [1]
+        # reads take the write lock too, end them before the other session writes
+        first.commit()
+        assert leases.claim(second, "second", [1, 2]) == [2]
+
+
+def test_shared_engine(engine):
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    assert journal_mode == "wal"
+
+
+def test_new_owner():
+    assert leases.new_owner() != leases.new_owner()
@@ -1,7 +1,102 @@
-from steam2sqlite import main
+import json
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from steam2sqlite import handler, main, models, schedule
 
 
 def test_main():
     """Runs the script for a brief time"""
     result = main.main(("--limit", "0.1"))
     assert result == 0
+
+
+def test_record_run_stats():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+
+    run_stats = models.RunStats(
+        started=datetime.utcnow() - timedelta(seconds=10), apps_stored=3
+    )
+    main.record_run_stats(engine, run_stats, Counter(requests=20, retries=2))
+
+    with Session(engine) as session:
+        stored = session.exec(select(models.RunStats)).one()
+    assert stored.apps_stored == 3
+    assert stored.requests == 20
+    assert stored.retries == 2
+    assert stored.requests_per_second == pytest.approx(2, rel=0.1)
+
+
+def test_count_errors():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+
+    with Session(engine) as session:
+        handler.record_appid_error(session, 1, "old error")
+        since = datetime.utcnow()
+        handler.record_appid_error(session, 2, "gone")
+        handler.record_appid_alias(session, 659, 620)
+
+        # 1 errored in an earlier batch, 659 is an alias and 3 wasn't stored
+        assert main.count_errors(session, [1, 2, 3, 659], since) == 1
+        assert main.count_errors(session, [], since) == 0
+
+
+def test_plan_lanes():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+
+    with Session(engine) as session:
+        with open("test_data/620.json") as app_data_file:
+            handler.import_single_app(session, json.load(app_data_file))
+        handler.record_appid_error(session, 659, "Portal 2 - Pre-order")
+        app = session.get(models.SteamApp, 620)
+        names = {620: "Portal 2", 659: "Portal 2 - Pre-order", 1: "new app"}
+
+        lanes = main.plan_lanes(session, names, app.updated)
+        assert lanes.depths() == {"new": 1, "refresh": 0, "retry": 0, "achievements": 1}
+
+        # apps that are refreshed get their achievements with the refresh
+        later = app.refresh_due + timedelta(days=schedule.ERROR_RETRY_INTERVAL)
+        lanes = main.plan_lanes(session, names, later)
+        assert {lane: list(queue) for lane, queue in lanes.queues.items()} == {
+            "new": [1],
+            "refresh": [620],
+            "retry": [659],
+            "achievements": [],
+        }
+
+
+def test_still_due():
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+
+    with Session(engine) as session:
+        with open("test_data/620.json") as app_data_file:
+            handler.import_single_app(session, json.load(app_data_file))
+        handler.record_appid_error(session, 659, "Portal 2 - Pre-order")
+        app = session.get(models.SteamApp, 620)
+        picks = [
+            ("new", 1),
+            ("new", 620),
+            ("refresh", 620),
+            ("retry", 659),
+            ("achievements", 620),
+        ]
+
+        # another crawler stored 620 and 659 errored since the lanes were planned
+        assert main.still_due(session, picks, app.updated) == [
+            ("new", 1),
+            ("achievements", 620),
+        ]
+        later = app.refresh_due + timedelta(days=schedule.ERROR_RETRY_INTERVAL)
+        assert main.still_due(session, picks, later) == [
+            ("new", 1),
+            ("refresh", 620),
+            ("retry", 659),
+            ("achievements", 620),
+        ]
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+
+import merge
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from steam2sqlite import handler, models
+
+
+def load_app(session, appid: int, **changes) -> models.SteamApp:
+    """Stores the portal 2 test data as `appid`"""
+    with open("test_data/620.json") as app_data_file:
+        data = json.load(app_data_file)["620"]
+    data["data"] |= {"steam_appid": appid} | changes
+    return handler.import_single_app(session, {str(appid): data})
+
+
+def load_achievements(session, app: models.SteamApp):
+    with open("test_data/620_achievements.json") as app_achievement_fh:
+        achievements = json.load(app_achievement_fh)["achievementpercentages"]
+    handler.store_apps_achievements(session, [(app, achievements["achievements"])])
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    def _make_db(name: str):
+        path = tmp_path / name
+        engine = create_engine(f"sqlite:///{path}", echo=False)
+        models.create_db_and_tables(engine)
+        return path, Session(engine)
+
+    return _make_db
+
+
+def test_merge_databases(make_db):
+    target_path, target = make_db("target.db")
+    source_path, source = make_db("source.db")
+
+    load_app(target, 620, name="old name")
+    handler.record_appid_error(target, 1000, "unknown", "error")
+    handler.record_appid_error(target, 659, "Portal 2 - Pre-order", "error")
+
+    # newer copy of 620 and a new app
+    load_achievements(source, load_app(source, 620))
+    load_achievements(source, load_app(source, 1000))
+    handler.record_appid_alias(source, 659, 620)
+    target.close()
+    source.close()
+
+    assert merge.merge_databases(target_path, [source_path]) == 2
+
+    _, merged = make_db("target.db")
+    apps = merged.exec(select(models.SteamApp)).all()
+    assert {app.appid: app.name for app in apps} == {620: "Portal 2", 1000: "Portal 2"}
+    for app in apps:
+        assert len(app.achievements) == app.achievements_total
+        assert merged.get(models.AchievementStats, app.appid).achievements == len(
+            app.achievements
+        )
+        assert merged.get(models.AppSummary, app.appid).name == app.name
+
+    # genres and categories are not duplicated
+    genre_ids = [genre.id for genre in merged.exec(select(models.Genre)).all()]
+    assert len(genre_ids) == len(set(genre_ids))
+    assert len(apps[0].genres) == len(apps[1].genres) > 0
+    assert len(apps[0].categories) == len(apps[1].categories) > 0
+
+    # appid 1000 was stored and 659 is an alias so they're not errors anymore
+    assert merged.exec(select(models.AppidError)).all() == []
+    assert handler.get_appid_aliases(merged) == {659: 620}
+
+
+def test_merge_keeps_newest(make_db):
+    source_path, source = make_db("source.db")
+    target_path, target = make_db("target.db")
+
+    load_app(source, 620, name="old name")
+    load_app(target, 620)
+    source.close()
+    target.close()
+
+    assert merge.merge_databases(target_path, [source_path]) == 0
+
+    conn = sqlite3.connect(target_path)
+    assert conn.execute("SELECT name FROM steam_app").fetchall() == [("Portal 2",)]
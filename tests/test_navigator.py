@@ -2,7 +2,8 @@ from unittest.mock import patch
 
 import pytest
 
-from steam2sqlite.navigator import NavigatorError, get, make_requests
+from steam2sqlite import navigator
+from steam2sqlite.navigator import NavigatorError, TokenBucket, get, make_requests
 
 
 @patch.object(get, "__defaults__", (100, None))
@@ -18,3 +19,51 @@ async def test_urls():
     for resp in responses:
         assert not isinstance(resp, NavigatorError)
         resp.raise_for_status()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+
+    # a burst of `capacity` requests, then reservations spaced by 1/rate
+    assert [bucket.reserve() for _ in range(5)] == [0, 0, 0, 0.5, 1.0]
+
+    # tokens refill with time, up to capacity
+    clock.now = 10
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+@pytest.mark.asyncio
+async def test_throttle_per_host(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(
+        navigator,
+        "buckets",
+        {
+            "store.steampowered.com": TokenBucket(1, 1, clock=clock),
+            "api.steampowered.com": TokenBucket(1, 1, clock=clock),
+        },
+    )
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(navigator.asyncio, "sleep", sleep)
+
+    await navigator.throttle("https://store.steampowered.com/api/appdetails/?appids=1")
+    await navigator.throttle("https://api.steampowered.com/ISteamUserStats/?gameid=1")
+    await navigator.throttle("https://example.com")
+    assert sleeps == []
+
+    # only the store requests wait on the store's bucket
+    await navigator.throttle("https://store.steampowered.com/api/appdetails/?appids=2")
+    assert sleeps == [1]
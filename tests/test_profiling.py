@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from steam2sqlite import profiling
+
+
+def busy(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def sleepy():
+    time.sleep(0.2)
+    return busy(10_000)
+
+
+def test_stage_profiler(tmp_path):
+    profiler = profiling.StageProfiler()
+    profiled_sleepy = profiler.wrap("sleepy", sleepy)
+    profiled_busy = profiler.wrap("busy", busy)
+
+    profiled_sleepy()
+    profiled_busy(100_000)
+
+    assert profiler.calls == {"sleepy": 1, "busy": 1}
+    # sleeping only counts towards wall time
+    assert profiler.wall["sleepy"] >= 0.2
+    assert profiler.cpu["sleepy"] < 0.2
+
+    profiler.dump(tmp_path, top_n=5)
+    assert (tmp_path / "sleepy.prof").exists()
+    assert (tmp_path / "busy.prof").exists()
+    summary = (tmp_path / "summary.txt").read_text()
+    assert "busy" in summary and "sleepy" in summary
+
+
+async def test_stage_profiler_async(tmp_path):
+    profiler = profiling.StageProfiler()
+
+    async def fetch():
+        return busy(1_000)
+
+    assert await profiler.wrap("fetch", fetch)() == busy(1_000)
+    assert profiler.calls["fetch"] == 1
+
+
+def test_profile_crawl_patches_and_restores():
+    from steam2sqlite import handler
+
+    original = handler.load_app_into_db
+    profiler = profiling.profile_crawl()
+    assert handler.load_app_into_db is not original
+
+    profiler.unpatch()
+    assert handler.load_app_into_db is original
+
+
+async def test_stage_profiler_counts_retries_once():
+    profiler = profiling.StageProfiler()
+
+    async def fetch(attempt: int = 1):
+        if attempt < 3:
+            return await profiled_fetch(attempt + 1)
+        return attempt
+
+    profiled_fetch = profiler.wrap("fetch", fetch)
+    assert await asyncio.gather(profiled_fetch(), profiled_fetch()) == [3, 3]
+    assert profiler.calls["fetch"] == 2
@@ -0,0 +1,33 @@
+import json
+import sqlite3
+
+import publish
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import handler, models
+
+
+def test_build(tmp_path):
+    source = tmp_path / "database.db"
+    engine = create_engine(f"sqlite:///{source}", echo=False)
+    models.create_db_and_tables(engine)
+    with Session(engine) as session, open("test_data/620.json") as app_data_file:
+        handler.import_single_app(session, json.load(app_data_file))
+        handler.record_appid_error(session, 1000, "unknown", "error")
+
+    output = tmp_path / "publish" / "database.db"
+    assert publish.main([str(source), str(output), "--page-size", "16384"]) == 0
+
+    conn = sqlite3.connect(output)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert "appid_error" not in tables
+    assert "sqlite_stat1" in tables
+    assert conn.execute("PRAGMA page_size").fetchone() == (16384,)
+    assert conn.execute(
+        "SELECT rowid FROM steam_app_fts WHERE steam_app_fts MATCH 'portal'"
+    ).fetchall() == [(620,)]
+
+    # the crawl database is left as it was
+    conn = sqlite3.connect(source)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    assert conn.execute("SELECT appid FROM appid_error").fetchall() == [(1000,)]
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+from steam2sqlite import models, schedule
+
+
+def test_next_interval():
+    assert schedule.next_interval(None, False, 3, 90) == 3
+    assert schedule.next_interval(3, False, 3, 90) == 6
+    assert schedule.next_interval(60, False, 3, 90) == 90
+    assert schedule.next_interval(60, True, 3, 90) == 3
+
+
+def test_is_new():
+    now = datetime(2024, 3, 1)
+    assert schedule.is_new(None, True, now)
+    assert schedule.is_new(date(2024, 2, 20), False, now)
+    assert not schedule.is_new(date(2023, 2, 20), False, now)
+    assert not schedule.is_new(None, False, now)
+
+
+def test_reschedule_refresh():
+    now = datetime(2024, 1, 1)
+    app = models.SteamApp(appid=1, name="app")
+
+    schedule.reschedule_refresh(app, False, now)
+    assert app.refresh_interval == schedule.REFRESH_MIN_INTERVAL
+    schedule.reschedule_refresh(app, False, now)
+    assert app.refresh_interval == 2 * schedule.REFRESH_MIN_INTERVAL
+    assert app.refresh_due == now + timedelta(days=app.refresh_interval)
+
+    # new and upcoming apps are refreshed more often
+    schedule.reschedule_refresh(app, False, now, new=True)
+    assert app.refresh_interval == schedule.NEW_APP_INTERVAL
+
+
+def test_achievements_changed():
+    stored = [models.Achievement(name="a", percent=50.0)]
+    assert not schedule.achievements_changed(stored, [{"name": "a", "percent": 50.4}])
+    assert not schedule.achievements_changed(stored, [{"name": "a", "percent": "50"}])
+    assert schedule.achievements_changed(stored, [{"name": "a", "percent": 52}])
+    assert schedule.achievements_changed(stored, [{"name": "b", "percent": 50}])
+    assert schedule.achievements_changed([], [{"name": "a", "percent": 50}])
+
+
+def test_achievements_due():
+    now = datetime(2024, 1, 1)
+    app = models.SteamApp(appid=1, name="app", achievements_total=10)
+    assert schedule.achievements_due(app, now)
+
+    schedule.reschedule_achievements(app, False, now)
+    assert app.achievements_due == now + timedelta(days=3)
+    assert not schedule.achievements_due(app, now)
+    assert schedule.achievements_due(app, app.achievements_due)
+
+    app.achievements_total = 0
+    assert not schedule.achievements_due(app, app.achievements_due)
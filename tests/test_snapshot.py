@@ -0,0 +1,108 @@
+import math
+import sqlite3
+import threading
+import time
+
+import pytest
+import snapshot
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "database.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE steam_app (appid INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany(
+        "INSERT INTO steam_app VALUES (?, ?)", ((i, "x" * 500) for i in range(2000))
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count(path) -> int:
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    return conn.execute("SELECT count(*) FROM steam_app").fetchone()[0]
+
+
+@pytest.mark.parametrize("method", ["backup", "vacuum"])
+def test_snapshot(database, tmp_path, method):
+    output = tmp_path / "snapshot.db"
+    snapshot.snapshot(database, output, method=method)
+
+    assert count(output) == 2000
+    assert not (tmp_path / "snapshot.db.partial").exists()
+
+
+def test_snapshot_while_writing(database, tmp_path):
+    def write():
+        conn = sqlite3.connect(database, timeout=10)
+        for i in range(2000, 2050):
+            conn.execute("INSERT INTO steam_app VALUES (?, ?)", (i, "y"))
+            conn.commit()
+            time.sleep(0.001)
+        conn.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    output = tmp_path / "snapshot.db"
+    snapshot.snapshot(database, output, pages=8, sleep=0.001)
+    writer.join()
+
+    assert 2000 <= count(output) <= 2050
+    assert count(database) == 2050
+
+
+def test_vacuum_switches_to_wal(database, tmp_path):
+    snapshot.snapshot(database, tmp_path / "snapshot.db")
+
+    conn = sqlite3.connect(database)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    conn.close()
+
+
+@pytest.fixture
+def write_between_steps(database, monkeypatch):
+    """The backup's sleeps between steps commit a row instead, `writes` times"""
+    conn = sqlite3.connect(database)
+    sleeps = []
+
+    def write(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) <= write.writes:
+            conn.execute("INSERT INTO steam_app (name) VALUES ('y')")
+            conn.commit()
+
+    write.writes = 0
+    write.sleeps = sleeps
+    monkeypatch.setattr(snapshot.time, "sleep", write)
+    yield write
+    conn.close()
+
+
+def test_backup_sleeps_between_steps(database, tmp_path, write_between_steps):
+    output = tmp_path / "snapshot.db"
+    assert snapshot.backup(database, output, pages=100, sleep=0.5) == 0
+
+    pages = sqlite3.connect(database).execute("PRAGMA page_count").fetchone()[0]
+    assert write_between_steps.sleeps == [0.5] * (math.ceil(pages / 100) - 1)
+    assert count(output) == 2000
+
+
+def test_backup_restarts(database, tmp_path, write_between_steps):
+    write_between_steps.writes = 2
+    output = tmp_path / "snapshot.db"
+    assert snapshot.backup(database, output, pages=1, max_restarts=2) == 2
+    assert count(output) == 2002
+
+
+def test_backup_gives_up_after_restarts(database, tmp_path, write_between_steps):
+    write_between_steps.writes = 100
+    with pytest.raises(snapshot.BackupRestartedError, match="restarted 3 times"):
+        snapshot.snapshot(
+            database, tmp_path / "snapshot.db", method="backup", pages=1, max_restarts=2
+        )
+    assert len(write_between_steps.sleeps) == 3
+    assert not (tmp_path / "snapshot.db").exists()
+    assert not (tmp_path / "snapshot.db.partial").exists()
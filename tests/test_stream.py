@@ -0,0 +1,119 @@
+import asyncio
+from contextlib import aclosing
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from steam2sqlite import navigator
+from steam2sqlite.handler import AppidAliasError, DataParsingError
+from steam2sqlite.stream import stream_apps
+
+
+def steam_responses(request: httpx.Request) -> httpx.Response:
+    """Serves test_data, 404 for anything else"""
+    appid = request.url.params.get("appids") or request.url.params.get("gameid")
+    suffix = "_achievements" if "gameid" in request.url.params else ""
+    path = Path(f"test_data/{appid}{suffix}.json")
+    if not path.exists():
+        return httpx.Response(404)
+    return httpx.Response(200, content=path.read_bytes())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(navigator, "buckets", {})
+    return httpx.AsyncClient(transport=httpx.MockTransport(steam_responses))
+
+
+@patch.object(navigator.get, "__defaults__", (100, None))
+async def test_stream_apps(client):
+    results = [result async for result in stream_apps([620, 659, 1], client=client)]
+
+    apps = [result for result in results if not isinstance(result, DataParsingError)]
+    assert len(apps) == 1
+    assert apps[0].name == "Portal 2"
+    assert len(apps[0].genres) > 0
+    assert len(apps[0].achievements) == apps[0].achievements_total
+
+    errors = {
+        result.appid: result
+        for result in results
+        if isinstance(result, DataParsingError)
+    }
+    assert isinstance(errors[659], AppidAliasError)
+    assert errors[659].target_appid == 620
+    assert not isinstance(errors[1], AppidAliasError)
+
+
+async def test_stream_apps_without_achievements(client):
+    results = [
+        result
+        async for result in stream_apps(iter([620]), achievements=False, client=client)
+    ]
+    assert [result.appid for result in results] == [620]
+    assert results[0].achievements == []
+
+
+async def test_stream_apps_bounds_requests_in_flight(client, monkeypatch):
+    in_flight = max_in_flight = 0
+    get = navigator.get
+
+    async def counting_get(client, url, *args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            return await get(client, url, *args, **kwargs)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(navigator, "get", counting_get)
+    results = [
+        result
+        async for result in stream_apps(
+            [620] * 10, achievements=False, concurrency=2, client=client
+        )
+    ]
+    assert len(results) == 10
+    assert max_in_flight <= 2
+
+
+async def test_stream_apps_malformed_responses(monkeypatch):
+    monkeypatch.setattr(navigator, "buckets", {})
+    bodies = {
+        "1": b"null",
+        "2": b"{}",
+        "3": b'{"3": {"success": true}}',
+        "4": b'{"4": {"success": true, "data": null}}',
+    }
+
+    def malformed_responses(request: httpx.Request) -> httpx.Response:
+        appid = request.url.params.get("appids")
+        if appid in bodies:
+            return httpx.Response(200, content=bodies[appid])
+        return steam_responses(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(malformed_responses))
+    results = [
+        result
+        async for result in stream_apps(
+            [1, 2, 3, 4, 620], achievements=False, client=client
+        )
+    ]
+
+    errors = sorted(
+        (result for result in results if isinstance(result, DataParsingError)),
+        key=lambda error: error.appid,
+    )
+    assert [error.appid for error in errors] == [1, 2, 3, 4]
+    assert all(error.reason.startswith("Malformed app data") for error in errors)
+    assert [result.appid for result in results if result not in errors] == [620]
+
+
+async def test_stream_apps_closed_early_awaits_pending(client):
+    async with aclosing(stream_apps([620] * 10, concurrency=5, client=client)) as apps:
+        async for _ in apps:
+            break
+    assert asyncio.all_tasks() == {asyncio.current_task()}
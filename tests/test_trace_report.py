@@ -0,0 +1,66 @@
+import json
+
+import trace_report
+
+
+def request(appid, total, attempt=1, status=200, host="store.steampowered.com"):
+    return {
+        "event": "request",
+        "appid": appid,
+        "host": host,
+        "attempt": attempt,
+        "status": status,
+        "error": None,
+        "bytes": 1024,
+        "queued": 0.5,
+        "pool": 0.0,
+        "connect": 0.0,
+        "tls": 0.0,
+        "ttfb": total / 2,
+        "total": total,
+    }
+
+
+def test_percentile():
+    ranked = list(range(1, 101))
+    assert trace_report.percentile(ranked, 50) == 50
+    assert trace_report.percentile(ranked, 99) == 99
+    assert trace_report.percentile(ranked, 99.9) == 100
+    assert trace_report.percentile([3.0], 50) == 3.0
+
+
+def test_tail_share():
+    assert trace_report.tail_share([1.0] * 99 + [99.0]) == 0.5
+    assert trace_report.tail_share([]) == 0.0
+
+
+def test_report(tmp_path, capsys):
+    events = [request(appid, 0.1) for appid in range(1, 99)]
+    events += [
+        request(620, 5.0, status=500),
+        request(620, 0.2, attempt=2),
+        {
+            "event": "write",
+            "op": "import_single_app",
+            "appid": 620,
+            "commit": 0.01,
+            "duration": 0.05,
+        },
+        {"event": "commit", "appid": None, "duration": 0.02},
+    ]
+    trace = tmp_path / "trace.jsonl"
+    trace.write_text("".join(json.dumps(event) + "\n" for event in events))
+
+    assert trace_report.main([str(trace), "--top", "2"]) == 0
+    output = capsys.readouterr().out
+    assert "100 requests, 1 retries" in output
+    assert "200: 99, 500: 1" in output
+    assert "store.steampowered.com total" in output
+    assert "import_single_app commit" in output
+    slowest = output.split("slowest 2 appids")[1].splitlines()[1:]
+    assert slowest[0].split() == ["620", "6.25s", "2", "requests"]
+    assert len(slowest) == 2
+
+
+def test_missing_trace(tmp_path):
+    assert trace_report.main([str(tmp_path / "trace.jsonl")]) == 2
@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from unittest.mock import patch
+
+import httpx
+import pytest
+from sqlmodel import Session, create_engine
+
+from steam2sqlite import handler, models, navigator, tracing
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Fails the first request of every path with a 500"""
+
+    protocol_version = "HTTP/1.1"
+    seen: ClassVar[set[str]] = set()
+
+    def do_GET(self):
+        status = 200 if self.path in self.seen else 500
+        self.seen.add(self.path)
+        body = json.dumps({"success": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    with tracing.trace_crawl(tmp_path / "trace.jsonl") as tracer:
+        yield tracer
+
+
+def read_events(tracer) -> list[dict]:
+    tracer.uninstall()
+    with open(tracer.file.name) as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+def test_appid_of_url():
+    assert tracing.appid_of_url("https://a.com/api/appdetails/?appids=620&l=en") == 620
+    assert tracing.appid_of_url("https://a.com/v2/?gameid=10&format=json") == 10
+    assert tracing.appid_of_url("https://a.com/GetAppList/v0002/") is None
+
+
+@patch.object(navigator, "buckets", {})
+async def test_trace_requests(server_url, tracer, monkeypatch):
+    async def sleep(seconds):
+        pass
+
+    monkeypatch.setattr(navigator.asyncio, "sleep", sleep)
+    async with httpx.AsyncClient() as client:
+        resp = await navigator.get(client, f"{server_url}/api/appdetails/?appids=620")
+    assert resp.json() == {"success": True}
+
+    failed, succeeded = read_events(tracer)
+    assert failed["event"] == succeeded["event"] == "request"
+    assert failed["appid"] == succeeded["appid"] == 620
+    assert failed["host"] == "127.0.0.1"
+    assert (failed["attempt"], failed["status"]) == (1, 500)
+    assert (succeeded["attempt"], succeeded["status"]) == (2, 200)
+    assert succeeded["bytes"] == len(b'{"success": true}')
+    # the connection of the first attempt is kept alive for the retry
+    assert failed["connect"] > 0
+    assert succeeded["connect"] == 0
+    assert succeeded["tls"] == 0
+    assert 0 < succeeded["ttfb"] <= succeeded["total"]
+    assert tracer.attempts == {}
+
+
+@patch.object(navigator, "buckets", {})
+async def test_trace_request_given_up(server_url, tracer):
+    # the first attempt of a path fails, and a wait this long isn't retried
+    with pytest.raises(navigator.NavigatorError):
+        await navigator.get(
+            httpx.AsyncClient(), f"{server_url}/api/appdetails/?appids=1", 2**7
+        )
+
+    assert tracer.attempts == {}
+    (failed,) = read_events(tracer)
+    assert (failed["appid"], failed["attempt"], failed["status"]) == (1, 1, 500)
+
+
+def test_trace_writes(tracer):
+    engine = create_engine("sqlite://", echo=False)
+    models.create_db_and_tables(engine)
+    with open("test_data/620.json") as app_data_file:
+        app_data = json.load(app_data_file)
+    with open("test_data/620_achievements.json") as achievements_file:
+        achievements = json.load(achievements_file)["achievementpercentages"][
+            "achievements"
+        ]
+
+    with Session(engine) as session:
+        app = handler.import_single_app(session, app_data)
+        handler.store_apps_achievements(session, [(app, achievements)])
+
+    events = read_events(tracer)
+    assert events[0]["event"] == "write"
+    assert events[0]["op"] == "import_single_app"
+    assert events[0]["appid"] == 620
+    assert 0 < events[0]["commit"] < events[0]["duration"]
+    assert [event["op"] for event in events[1:-1]] == ["attach_achievements_to_app"]
+    # the achievements are committed together after they're attached
+    assert events[-1]["event"] == "commit"
+    assert events[-1]["appid"] is None
+
+    # uninstalled, nothing is traced anymore
+    assert handler.import_single_app.__name__ == "import_single_app"
+    assert navigator.tracer is None
@@ -0,0 +1,115 @@
+import hashlib
+from types import SimpleNamespace
+
+import dropbox
+import pytest
+import requests
+import uploader
+
+
+def dropbox_hash(data: bytes) -> str:
+    block_size = 4 * 1024 * 1024
+    blocks = (data[i : i + block_size] for i in range(0, len(data), block_size))
+    return hashlib.sha256(
+        b"".join(hashlib.sha256(block).digest() for block in blocks)
+    ).hexdigest()
+
+
+class FakeDropbox:
+    """Stand in for the dropbox client that keeps files in memory
+
+    The first `lost_appends` appends are stored but raise as if the response was lost
+    """
+
+    def __init__(self, lost_appends: int = 0):
+        self.files: dict[str, bytes] = {}
+        self.sessions: dict[str, bytearray] = {}
+        self.lost_appends = lost_appends
+        self.uploads = 0
+        self.metadata_requests = 0
+
+    def metadata(self, path: str):
+        data = self.files[path]
+        return SimpleNamespace(name=path.lstrip("/"), content_hash=dropbox_hash(data))
+
+    def files_get_metadata(self, path: str):
+        self.metadata_requests += 1
+        if path not in self.files:
+            error = dropbox.files.GetMetadataError.path(
+                dropbox.files.LookupError.not_found
+            )
+            raise dropbox.exceptions.ApiError("request-id", error, None, None)
+        return self.metadata(path)
+
+    def check_offset(self, cursor):
+        data = self.sessions[cursor.session_id]
+        if cursor.offset != len(data):
+            error = dropbox.files.UploadSessionAppendError.incorrect_offset(
+                dropbox.files.UploadSessionOffsetError(correct_offset=len(data))
+            )
+            raise dropbox.exceptions.ApiError("request-id", error, None, None)
+
+    def files_upload_session_start(self, f):
+        session_id = f"session-{len(self.sessions)}"
+        self.sessions[session_id] = bytearray(f)
+        return SimpleNamespace(session_id=session_id)
+
+    def files_upload_session_append_v2(self, f, cursor):
+        self.check_offset(cursor)
+        self.sessions[cursor.session_id] += f
+        if self.lost_appends:
+            self.lost_appends -= 1
+            raise requests.exceptions.ConnectionError("connection reset")
+
+    def files_upload_session_finish(self, f, cursor, commit):
+        self.check_offset(cursor)
+        self.files[commit.path] = bytes(self.sessions.pop(cursor.session_id) + f)
+        self.uploads += 1
+        return self.metadata(commit.path)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setitem(uploader.with_retries.__kwdefaults__, "wait_time", 0)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "database.db"
+    path.write_bytes(bytes(range(256)) * 10)
+    return path
+
+
+def test_content_hash(database):
+    assert uploader.content_hash(database) == dropbox_hash(database.read_bytes())
+
+
+def test_upload_in_chunks(database):
+    dbx = FakeDropbox()
+    res = uploader.upload(dbx, database, "/database.db", chunk_size=100)
+
+    assert res.content_hash == uploader.content_hash(database)
+    assert dbx.files["/database.db"] == database.read_bytes()
+
+
+def test_upload_resumes_after_lost_response(database):
+    dbx = FakeDropbox(lost_appends=2)
+    res = uploader.upload(dbx, database, "/database.db", chunk_size=100)
+
+    assert res is not None
+    assert dbx.files["/database.db"] == database.read_bytes()
+
+
+def test_upload_skips_unchanged(database):
+    dbx = FakeDropbox()
+    uploader.upload(dbx, database, "/database.db", chunk_size=100)
+    dbx.metadata_requests = 0
+    res = uploader.upload(dbx, database, "/database.db", chunk_size=100)
+    assert dbx.uploads == 1
+    assert res.content_hash == uploader.content_hash(database)
+    assert dbx.metadata_requests == 1
+
+    database.write_bytes(b"changed")
+    uploader.upload(dbx, database, "/database.db", chunk_size=100)
+    assert dbx.uploads == 2
+    assert dbx.files["/database.db"] == b"changed"
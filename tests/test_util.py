@@ -1,37 +1,35 @@
-import time
+from argparse import ArgumentTypeError
 
 import pytest
 
 from steam2sqlite import utils
 
 
-def hello():
-    print("hello")
+def test_parse_shard():
+    assert utils.parse_shard("1/4") == (1, 4)
 
+    for value in ("4/4", "-1/4", "1", "a/b"):
+        with pytest.raises(ArgumentTypeError):
+            utils.parse_shard(value)
 
-def slow_hello():
-    time.sleep(0.5)
 
+def test_in_shard_partitions_appids():
+    appids = range(1000)
+    shards = [
+        {appid for appid in appids if utils.in_shard(appid, (i, 3))} for i in range(3)
+    ]
 
-def test_delay_by():
-    # we're calling the decorator directly here so that we can control the delay time
-    delay_time = 0.5
+    assert set().union(*shards) == set(appids)
+    assert sum(len(shard) for shard in shards) == len(appids)
 
-    begin = time.monotonic()
-    utils.delay_by(delay_time)(hello)()
-    dur = time.monotonic() - begin
-    assert dur > delay_time
-    assert dur == pytest.approx(delay_time, rel=0.1)
 
-    begin = time.monotonic()
-    utils.delay_by(delay_time)(slow_hello)()  # takes .5 sec
-    dur = time.monotonic() - begin
-    assert dur > delay_time
-    assert dur == pytest.approx(0.5, rel=0.1)
+def test_shard_file_name():
+    assert utils.shard_file_name("database.db", (0, 4)) == "database.shard-0-of-4.db"
 
-    delay_time = 0.25
-    begin = time.monotonic()
-    utils.delay_by(delay_time)(slow_hello)()  # takes 0.5 sec
-    dur = time.monotonic() - begin
-    assert dur > delay_time
-    assert dur == pytest.approx(0.5, rel=0.1)
+
+def test_parse_lane_weight():
+    assert utils.parse_lane_weight("retry=2") == ("retry", 2)
+
+    for value in ("retries=2", "retry", "retry=-1", "retry=a"):
+        with pytest.raises(ArgumentTypeError):
+            utils.parse_lane_weight(value)